@@ -0,0 +1,85 @@
+"""基于本地模拟服务的端到端性能测试。
+
+在项目根目录运行：
+
+    python -m benchmarks.bench_e2e [--rounds 10] [--latency-ms 20] [--error-rate 0] [--jobs 40]
+
+测量三项指标：
+- login：完整登陆（登陆页、验证码检查、提交表单、进入能源管理主页）的耗时；
+- pay_electricity：冷启动（不使用会话缓存）与热启动（命中会话缓存）的单次充值耗时；
+- batch：一次登陆后批量充值的吞吐量（任务/秒）。
+"""
+
+import os
+
+# 性能测试的调用不计入 data/metrics.jsonl。
+os.environ.setdefault("FEE_METRICS", "0")
+# 测量的是客户端本身的开销，不启用对真实服务端的限速。
+os.environ.setdefault("FEE_SCHEDULER", "0")
+
+import argparse  # noqa: E402
+import statistics  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+
+from benchmarks.mock_server import MockServer, patch_urls  # noqa: E402
+from core.batch import RechargeJob, batch_recharge  # noqa: E402
+from core.electricity import login_service, pay_electricity, wait_for_management  # noqa: E402
+from core.recharge_journal import RechargeJournal  # noqa: E402
+from core.session_cache import SessionCache  # noqa: E402
+
+
+def timings(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def describe(name, samples):
+    samples = sorted(samples)
+    p90 = samples[min(int(len(samples) * 0.9), len(samples) - 1)]
+    print(f"{name:<28} p50 {statistics.median(samples) * 1000:8.1f} ms   "
+          f"p90 {p90 * 1000:8.1f} ms   n={len(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20, help="模拟服务每个请求的附加延迟")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务返回 503 的概率")
+    parser.add_argument("--jobs", type=int, default=40, help="批量充值的任务数")
+    args = parser.parse_args()
+
+    with MockServer(latency=args.latency_ms / 1000, error_rate=args.error_rate) as server, \
+            patch_urls(server.base_url), tempfile.TemporaryDirectory() as tmp:
+        host = server.base_url.split("://")[1].split(":")[0]
+        cache = SessionCache(os.path.join(tmp, "session_cache.json"), domains=(host,))
+        journal = RechargeJournal(os.path.join(tmp, "recharge_journal.jsonl"))
+        print(f"模拟服务 {server.base_url}，延迟 {args.latency_ms:.0f} ms，错误率 {args.error_rate:.0%}")
+
+        def login():
+            service = login_service("bench", "bench")
+            wait_for_management(service.session)
+
+        describe("login", timings(login, args.rounds))
+        describe("pay_electricity (cold)",
+                 timings(lambda: pay_electricity("bench", "bench", "C3", "101", 10, cache=None, journal=journal), args.rounds))
+        pay_electricity("bench", "bench", "C3", "101", 10, cache=cache, journal=journal)
+        describe("pay_electricity (warm)",
+                 timings(lambda: pay_electricity("bench", "bench", "C3", "101", 10, cache=cache, journal=journal),
+                                   args.rounds))
+
+        jobs = [RechargeJob("C3", str(100 + i), 10) for i in range(args.jobs)]
+        start = time.perf_counter()
+        results = batch_recharge("bench", "bench", jobs, cache=cache, journal=journal)
+        elapsed = time.perf_counter() - start
+        ok = sum(r.success for r in results)
+        print(f"{'batch':<28} {len(jobs) / elapsed:8.1f} 任务/s   成功 {ok}/{len(jobs)}")
+        print(f"模拟服务共处理 {server.state.requests} 个请求")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""比较各 HTML 解析后端在登陆流程中的 CPU 耗时。
+
+在项目根目录运行：
+
+    python -m benchmarks.bench_html_parse [--rounds 200]
+
+每次登陆需要解析一次统一身份认证登陆页（提取隐藏字段）和一次能源管理主页（检查是否需要登陆），
+页面样本位于 benchmarks/data。
+"""
+
+import argparse
+import os
+import time
+
+from core.html_parse import BACKENDS, is_auth_page, parse_login_form
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def read_page(name):
+    with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def available(backend):
+    # html_parse 在 lxml 缺失时会静默退回 bs4，这里单独检查以免重复计时。
+    if backend != "lxml":
+        return True
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def bench(backend, login_page, home_page, rounds):
+    start = time.process_time()
+    for _ in range(rounds):
+        parse_login_form(login_page, backend)
+        is_auth_page(home_page, backend)
+    return (time.process_time() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    login_page = read_page("login_page.html")
+    home_page = read_page("electricity_home.html")
+    expected = parse_login_form(login_page, "bs4")
+
+    results = {}
+    for backend in BACKENDS:
+        if not available(backend):
+            print(f"{backend:<6} 不可用，跳过")
+            continue
+        assert parse_login_form(login_page, backend) == expected, backend
+        results[backend] = bench(backend, login_page, home_page, args.rounds)
+
+    baseline = results.get("bs4")
+    for backend, cost in results.items():
+        speedup = f"{baseline / cost:6.1f}x" if baseline else ""
+        print(f"{backend:<6} {cost * 1000:8.3f} ms/登陆  {speedup}")
+
+
+if __name__ == "__main__":
+    main()
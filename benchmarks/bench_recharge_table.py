@@ -0,0 +1,105 @@
+"""比较账单的两种解析方式的内存占用与吞吐量。
+
+在项目根目录运行：
+
+    python -m benchmarks.bench_recharge_table [--rows 100000] [--chunk 65536]
+
+- generator：`response.json()` 整体解析后逐条构造 `RechargeInfo`（即 `ElectricityManagement.recharge_info`），
+  保存为列表；
+- table：`iter_bill_rows` 流式解析响应字节块，写入按列存储的 `RechargeTable`。
+
+分别报告解析耗时、解析过程中的内存峰值与解析结果常驻的内存（tracemalloc），以及按月汇总金额和平均单价的耗时。
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+from core.electricity import RechargeInfo
+from core.recharge_table import RechargeTable, iter_bill_rows
+
+
+def make_body(rows):
+    start = time.time() - rows * 3600
+    info = [{
+        "oid": i + 1,
+        "type": "网上充值",
+        "money": round((i % 50 + 1) * 0.617, 2),
+        "quantity": i % 50 + 1,
+        "datetime": datetime.fromtimestamp(start + i * 3600).isoformat(timespec="seconds"),
+    } for i in range(rows)][::-1]
+    return json.dumps({"success": True, "info": info}, ensure_ascii=False).encode("utf-8")
+
+
+def chunked(body, size):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def parse_generator(body, chunk):
+    data = json.loads(b"".join(chunked(body, chunk)))
+    return [
+        RechargeInfo(int(i["oid"]), i["type"], float(i["money"]), int(i["quantity"]),
+                     datetime.fromisoformat(i["datetime"]))
+        for i in data["info"]
+    ]
+
+
+def parse_table(body, chunk):
+    return RechargeTable.from_rows(iter_bill_rows(chunked(body, chunk)))
+
+
+def aggregate_generator(infos):
+    by_month = defaultdict(float)
+    for info in infos:
+        by_month[info.time.strftime("%Y-%m")] += info.money
+    quantity = sum(info.quantity for info in infos)
+    return dict(by_month), sum(info.money for info in infos) / quantity
+
+
+def aggregate_table(table):
+    return table.sum_by_month(), table.average_price()
+
+
+def measure(parse, body, chunk):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = parse(body, chunk)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=64 * 1024, help="模拟响应流的字节块大小")
+    args = parser.parse_args()
+
+    body = make_body(args.rows)
+    print(f"{args.rows} 条账单，响应 {len(body) / 2 ** 20:.1f} MiB")
+
+    results = {}
+    for name, parse, aggregate in (("generator", parse_generator, aggregate_generator),
+                                   ("table", parse_table, aggregate_table)):
+        result, elapsed, retained, peak = measure(parse, body, args.chunk)
+        start = time.perf_counter()
+        by_month, price = aggregate(result)
+        agg = time.perf_counter() - start
+        results[name] = (by_month, price)
+        print(f"{name:<10} 解析 {elapsed * 1000:8.1f} ms ({args.rows / elapsed:9.0f} 条/s)   "
+              f"峰值 {peak / 2 ** 20:7.1f} MiB   常驻 {retained / 2 ** 20:7.1f} MiB   "
+              f"汇总 {agg * 1000:7.1f} ms")
+
+    (months_a, price_a), (months_b, price_b) = results["generator"], results["table"]
+    assert months_a.keys() == months_b.keys()
+    assert all(abs(months_a[k] - months_b[k]) < 1e-6 for k in months_a)
+    assert abs(price_a - price_b) < 1e-9
+
+
+if __name__ == "__main__":
+    main()
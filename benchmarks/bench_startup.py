@@ -0,0 +1,83 @@
+"""测量各入口的导入耗时（基于 `python -X importtime`），防止启动时间退化。
+
+在项目根目录运行：
+
+    python -m benchmarks.bench_startup [--rounds 5] [--budget-ms 250]
+
+快速充值入口不得导入 FORBIDDEN 中的模块；超过预算或导入了禁止的模块时以非零状态退出。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (名称, 要导入的模块)
+ENTRIES = [
+    ("main", "main"),
+    ("recharge", "interface.quick"),
+    ("daemon", "interface.daemon"),
+    ("interactive", "interface.cli"),
+]
+
+# 快速入口不应触发的重量级依赖
+FORBIDDEN = ("questionary", "prompt_toolkit", "bs4")
+
+
+def import_profile(module):
+    """返回 (导入 module 的累计耗时 ms, 被导入的模块集合, 自身耗时最高的模块)。"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    modules = set()
+    selfs = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        modules.add(name)
+        selfs.append((int(self_us), name))
+        if name == module:
+            total = int(cumulative_us) / 1000
+    selfs.sort(reverse=True)
+    return total, modules, selfs[:5]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=250, help="快速充值入口的导入耗时上限")
+    args = parser.parse_args()
+
+    failed = False
+    for name, module in ENTRIES:
+        samples = []
+        for _ in range(args.rounds):
+            total, modules, top = import_profile(module)
+            samples.append(total)
+        median = statistics.median(samples)
+        print(f"{name:<12} {median:8.1f} ms  " + ", ".join(f"{n} {t / 1000:.1f}ms" for t, n in top[:3]))
+
+        if module == "interface.quick":
+            leaked = [m for m in FORBIDDEN if m in modules]
+            if leaked:
+                print(f"  ❌ 快速入口导入了 {', '.join(leaked)}")
+                failed = True
+            if median > args.budget_ms:
+                print(f"  ❌ 超过预算 {args.budget_ms:.0f} ms")
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""统一身份认证与能源管理接口的本地模拟服务，用于离线性能测试。
+
+模拟的接口：
+
+- ids.shiep.edu.cn: `/authserver/login`（GET/POST）、`/authserver/needCaptcha.html`、
+  `/authserver/captcha.html`、`/authserver/logout`
+- 10.50.2.206: `/`（主页，未登陆时返回认证页）、`/api/charge/query`、`/api/charge/user_account`、
+  `/api/charge/Submit`、`/api/charge/GetRoom`
+
+两个站点由同一个服务提供，`patch_urls` 会把 `AuthService` 与 `ElectricityManagement`
+的接口地址临时指向该服务。每个请求都会附加 `latency` 秒的延迟，并以 `error_rate` 的概率返回 503。
+"""
+
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from core.auth import AuthService
+from core.electricity import ElectricityManagement
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+AUTH_PAGE = '<html><body><div class="auth_page_wrapper"><p>请先登录</p></div></body></html>'
+# 最小的合法 JPEG：SOI + EOI
+CAPTCHA_JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00\xff\xd9"
+
+
+def _read_page(name):
+    with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class MockState:
+    """模拟服务的状态：已签发的票据、会话与充值记录。"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, captcha_rate: float = 0.0,
+                 history_size: int = 200, seed: int = 0) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.captcha_rate = captcha_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tgts = set()
+        self.sessions = set()
+        self.requests = 0
+        self.login_page = _read_page("login_page.html")
+        self.home_page = _read_page("electricity_home.html")
+        self.reskwh = 50.0
+        self.history = []
+        self.next_oid = 1
+        start = time.time() - history_size * 86400
+        for i in range(history_size):
+            self._add_history(20, start + i * 86400)
+
+    def _add_history(self, kwh, ts):
+        self.history.insert(0, {
+            "oid": self.next_oid,
+            "type": "网上充值",
+            "money": round(kwh * 0.617, 2),
+            "quantity": kwh,
+            "datetime": datetime.fromtimestamp(ts).isoformat(timespec="seconds"),
+        })
+        self.next_oid += 1
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def recharge(self, kwh):
+        with self.lock:
+            self.reskwh += kwh
+            self._add_history(kwh, time.time())
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 头部与正文一次写出，避免 Nagle 算法与延迟确认叠加出的额外 40 ms 干扰测量。
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    state: MockState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- 工具方法 --
+
+    def _cookies(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return {k: v.value for k, v in cookie.items()}
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", cookies=(), headers=()):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in cookies:
+            self.send_header("Set-Cookie", f"{name}={value}; Path=/")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, payload):
+        self._send(200, json.dumps(payload, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def _logged_in(self):
+        return self._cookies().get("EMSESSION") in self.state.sessions
+
+    def _prologue(self):
+        with self.state.lock:
+            self.state.requests += 1
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.roll(self.state.error_rate):
+            self._send(503, "service unavailable")
+            return False
+        return True
+
+    def _read_form(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+
+    # -- 路由 --
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if not self._prologue():
+            return
+        if url.path == "/authserver/login":
+            self._send(200, self.state.login_page, cookies=[("JSESSIONID", secrets.token_hex(8))])
+        elif url.path == "/authserver/needCaptcha.html":
+            self._send(200, "true" if self.state.roll(self.state.captcha_rate) else "false", "text/plain")
+        elif url.path == "/authserver/captcha.html":
+            self._send(200, CAPTCHA_JPEG, "image/jpeg")
+        elif url.path == "/authserver/logout":
+            self.state.tgts.discard(self._cookies().get("CASTGC"))
+            self._send(200, "logout")
+        elif url.path == "/":
+            self._home(query)
+        elif url.path.startswith("/api/charge/"):
+            self._api(url.path[len("/api/charge/"):], query)
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        form = self._read_form()
+        if not self._prologue():
+            return
+        if url.path == "/authserver/login":
+            self._login(form)
+        elif url.path == "/api/charge/Submit":
+            if not self._logged_in():
+                self._send(200, AUTH_PAGE)
+                return
+            self.state.recharge(int(form["kwh"]))
+            self._json({"success": True, "info": "充值成功"})
+        else:
+            self._send(404, "not found")
+
+    def _login(self, form):
+        if not form.get("username") or not form.get("password") or "lt" not in form:
+            self._send(200, self.state.login_page)
+            return
+        tgt = "TGT-" + secrets.token_hex(8)
+        self.state.tgts.add(tgt)
+        self._send(302, cookies=[("CASTGC", tgt), ("iPlanetDirectoryPro", secrets.token_hex(8))],
+                   headers=[("Location", f"/?ticket=ST-{secrets.token_hex(6)}")])
+
+    def _home(self, query):
+        # 带票据访问或持有有效的 CASTGC 时签发能源管理系统的会话，模拟单点登陆的跳转。
+        if self._logged_in():
+            self._send(200, self.state.home_page)
+        elif "ticket" in query or self._cookies().get("CASTGC") in self.state.tgts:
+            session = secrets.token_hex(8)
+            self.state.sessions.add(session)
+            self._send(200, self.state.home_page, cookies=[("EMSESSION", session)])
+        else:
+            self._send(200, AUTH_PAGE)
+
+    def _api(self, name, query):
+        if not self._logged_in():
+            self._send(200, AUTH_PAGE)
+        elif name == "query":
+            self._json({"success": True, "info": [{
+                "recharges": len(self.state.history), "reskwh": f"{self.state.reskwh:.2f}",
+                "P": "230", "U": "221", "FP": "0.98", "limit": "10", "state": "1",
+            }]})
+        elif name == "user_account":
+            with self.state.lock:
+                history = list(self.state.history)
+            self._json({"success": True, "info": history})
+        elif name == "GetRoom":
+            self._json({"success": True, "info": [{"building": "C3", "room": "101"}]})
+        else:
+            self._send(404, "not found")
+
+
+class MockServer:
+    """在后台线程中运行的模拟服务。"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **state_kwargs) -> None:
+        self.state = MockState(**state_kwargs)
+        handler = type("BoundMockHandler", (MockHandler,), {"state": self.state})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+@contextmanager
+def patch_urls(base_url: str):
+    """把各接口地址临时指向模拟服务。"""
+    targets = {
+        AuthService: {
+            "login_url": "/authserver/login",
+            "logout_url": "/authserver/logout",
+            "need_captcha_url": "/authserver/needCaptcha.html",
+            "captcha_image_url": "/authserver/captcha.html",
+        },
+        ElectricityManagement: {
+            "home_url": "/",
+            "meter_state_url": "/api/charge/query",
+            "recharge_info_url": "/api/charge/user_account",
+            "recharge_url": "/api/charge/Submit",
+            "get_room_url": "/api/charge/GetRoom",
+        },
+    }
+    saved = {cls: {name: getattr(cls, name) for name in attrs} for cls, attrs in targets.items()}
+    try:
+        for cls, attrs in targets.items():
+            for name, path in attrs.items():
+                setattr(cls, name, base_url + path)
+        yield
+    finally:
+        for cls, attrs in saved.items():
+            for name, value in attrs.items():
+                setattr(cls, name, value)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--captcha-rate", type=float, default=0)
+    args = parser.parse_args()
+    server = MockServer(port=args.port, latency=args.latency_ms / 1000,
+                        error_rate=args.error_rate, captcha_rate=args.captcha_rate)
+    print(f"模拟服务: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
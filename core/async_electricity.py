@@ -0,0 +1,101 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Union
+
+from core.batch import RechargeJob
+from core.electricity import ElectricityManagement, MeterState, RechargeInfo, open_management
+from core.recharge_journal import RechargeJournal, default_recharge_journal, submit_recharge
+from core.room_cache import RoomCache, default_room_cache
+from core.session_cache import SessionCache, default_session_cache
+
+
+class AsyncElectricityManagement:
+    """能源管理的 asyncio 版本。
+
+    底层复用同步版本已登陆的 `requests.Session`（包括 cookie 与 SOCKS5 代理配置），
+    请求在独立的线程池中执行，并用信号量限制同时进行的请求数。
+    充值与同步版本一样通过预写日志提交（`core.recharge_journal.submit_recharge`），同一账户的充值依次进行。
+    """
+
+    def __init__(self, em: ElectricityManagement, account: str, max_concurrency: int = 8,
+                 journal: RechargeJournal = default_recharge_journal,
+                 room_cache: Optional[RoomCache] = default_room_cache) -> None:
+        self._em = em
+        self.account = account
+        self.journal = journal
+        self.room_cache = room_cache
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    @classmethod
+    async def open(
+        cls,
+        username,
+        password,
+        proxy_config=None,
+        cache: Optional[SessionCache] = default_session_cache,
+        max_concurrency: int = 8,
+        journal: RechargeJournal = default_recharge_journal,
+    ) -> "AsyncElectricityManagement":
+        """登陆（或复用缓存的会话）并返回异步客户端。"""
+        loop = asyncio.get_running_loop()
+        em, _ = await loop.run_in_executor(
+            None, functools.partial(open_management, username, password, proxy_config, cache)
+        )
+        return cls(em, username, max_concurrency, journal)
+
+    @property
+    def sync(self) -> ElectricityManagement:
+        return self._em
+
+    async def _call(self, fn, *args):
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def meter_state(self) -> MeterState:
+        """获取电表状态。"""
+        return await self._call(lambda: self._em.meter_state)
+
+    async def recharge_info(self) -> List[RechargeInfo]:
+        """获取历次的电表充值账单。"""
+        return await self._call(lambda: list(self._em.recharge_info))
+
+    async def recharge(self, building: str, room: str, kwh: int) -> RechargeInfo:
+        """充值电费，返回对应的账单。"""
+        return await self._call(submit_recharge, self._em, self.account, building, room, kwh, self.journal)
+
+    async def recharge_my_room(self, kwh: int) -> RechargeInfo:
+        """给自己的宿舍充值电费，返回对应的账单。"""
+        building, room = await self._call(self._em.my_room, self.account, self.room_cache)
+        return await self.recharge(building, room, kwh)
+
+    async def recharge_many(self, jobs: Iterable[RechargeJob]) -> List[Union[RechargeInfo, BaseException]]:
+        """依次执行多个充值任务（同一账户的充值不能并发），失败的任务在对应位置返回异常对象。"""
+        results = []
+        for job in jobs:
+            try:
+                results.append(await self.recharge(job.building, job.room, job.kwh))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncElectricityManagement":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+
+async def gather_meter_states(
+    clients: Iterable[AsyncElectricityManagement],
+) -> List[Union[MeterState, BaseException]]:
+    """同时读取多个账户的电表状态，失败的账户在对应位置返回异常对象。"""
+    return await asyncio.gather(*(c.meter_state() for c in clients), return_exceptions=True)
+
+
+__all__ = ("AsyncElectricityManagement", "gather_meter_states")
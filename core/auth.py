@@ -1,13 +1,13 @@
 import time
 import requests
-from bs4 import BeautifulSoup
 
+from core.html_parse import parse_login_form
+from core.metrics import timed
+from core.transport import new_session
 from core.util import AuthServiceError
-import os
 from typing import Optional, Dict
 
 
-
 class AuthService:
     """登陆统一身份认证平台。"""
 
@@ -16,29 +16,27 @@ class AuthService:
     need_captcha_url = "https://ids.shiep.edu.cn/authserver/needCaptcha.html"
     captcha_image_url = "https://ids.shiep.edu.cn/authserver/captcha.html"
 
+    @timed("auth.init")
     def __init__(
         self,
         user_name: str,
         password: str,
         remember_me: bool = False,
         proxy_config: Optional[Dict[str, str]] = None,
+        session: Optional[requests.Session] = None,
         **kwargs,
     ) -> None:
         self._kwargs = kwargs
 
-        self._session = requests.Session()
-        # 应用 SOCKS5 代理配置
-        if proxy_config:
-            self._session.proxies = proxy_config
-        self._session.headers["User-Agent"] = os.getenv('FEE_UA', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36 Edg/133.0.0.0')
+        self._session = session if session is not None else new_session(proxy_config)
         response = self._session.get(
             self.login_url,
             params=self._kwargs,
         )
         response.raise_for_status()
-        dom = BeautifulSoup(response.text, features="html.parser")
+        hidden_fields, has_error = parse_login_form(response.text)
 
-        if len(dom.select("div#msg.errors")) > 0:
+        if has_error:
             raise AuthServiceError("unregistered application")
         # 以下字典存储的是 web 端登陆界面中表单里的各个字段名和值。
         self._form_data = {"username": user_name, "password": password}
@@ -46,8 +44,7 @@ class AuthService:
             self._form_data["rememberMe"] = "on"
         # 获取不在浏览器中显示的 input 标签的字段名和值，它们对于登陆来说也是必须的。
         # 这些值可能是随机的生成的，需要解析 HTML 并获取。
-        for element in dom.select("input[type=hidden]"):
-            self._form_data[element.attrs["name"]] = element.attrs["value"]
+        self._form_data.update(hidden_fields)
 
         self._status = 0
         self._need_captcha = False
@@ -56,12 +53,22 @@ class AuthService:
     def session(self) -> requests.Session:
         return self._session
 
-    def need_captcha(self) -> bool:
-        """检查需要登陆的用户是否需要填写验证码。"""
+    @timed("auth.need_captcha")
+    def need_captcha(self, known: Optional[bool] = None) -> bool:
+        """检查需要登陆的用户是否需要填写验证码。
+
+        known 为缓存的检查结果，提供时不再发送检查请求。
+        """
         if self._status != 0:
             raise AuthServiceError("wrong auth step")
         self._status += 1
 
+        if known is not None:
+            self._need_captcha = known
+            if not known:
+                self._status += 1
+            return known
+
         # 是否需要填写验证码是动态获取的，其核心逻辑未知。
         response = self._session.get(
             self.need_captcha_url,
@@ -75,6 +82,7 @@ class AuthService:
         self._status += 1
         return False
 
+    @timed("auth.captcha_image")
     def get_captcha_image(self) -> bytes:
         """获取验证码。
 
@@ -104,6 +112,7 @@ class AuthService:
             self._form_data["captchaResponse"] = captcha_code
             self._status += 1
 
+    @timed("auth.login")
     def login(self):
         """登陆。"""
         if self._need_captcha and "captchaResponse" not in self._form_data:
@@ -124,6 +133,7 @@ class AuthService:
             raise AuthServiceError("wrong username or password")
 
 
+    @timed("auth.logout")
     def logout(self) -> None:
         """退出登陆。"""
         self._session.get(self.logout_url).raise_for_status()
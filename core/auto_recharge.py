@@ -0,0 +1,210 @@
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, List, Optional
+
+from core.electricity import MeterState, open_management
+from core.meter_store import MeterReading, MeterStore, consumption_of
+from core.recharge_journal import RechargeJournal, default_recharge_journal, submit_recharge
+from core.room_cache import RoomCache, default_room_cache
+from core.scheduler import polling
+from core.session_cache import SessionCache, default_session_cache
+
+
+@dataclass
+class ManagedRoom:
+    """由自动充值托管的房间。
+
+    能源管理接口返回的电表状态属于登陆账户本人的宿舍，因此每个房间以其付费账户区分，
+    且只能托管该账户本人的宿舍（GetRoom 返回的房间）。楼栋或房间号留空表示本人的宿舍。
+    """
+
+    account: str
+    password: str
+    building: str
+    room: str
+    kwh: int
+    lead_hours: float = 24
+    min_reskwh: float = 5
+
+
+@dataclass
+class Forecast:
+    """某个房间的电量预测。"""
+
+    room: ManagedRoom
+    reskwh: float
+    rate: float
+    hours_left: Optional[float]
+    recharged: bool = False
+    cooling: bool = False
+    error: str = ""
+
+    @property
+    def should_recharge(self) -> bool:
+        if self.reskwh <= self.room.min_reskwh:
+            return True
+        return self.hours_left is not None and self.hours_left <= self.room.lead_hours
+
+
+def burn_rate(readings: List[MeterReading], state: MeterState) -> float:
+    """估算耗电速度（kWh/h）。
+
+    优先使用采样窗口内剩余电量的下降量；采样不足时退回到当前功率（W）。
+    """
+    if len(readings) >= 2:
+        hours = (readings[-1].time - readings[0].time).total_seconds() / 3600
+        if hours > 0:
+            return consumption_of(readings) / hours
+    return max(state.power, 0) / 1000
+
+
+def forecast(room: ManagedRoom, state: MeterState, readings: List[MeterReading]) -> Forecast:
+    rate = burn_rate(readings, state)
+    hours_left = state.reskwh / rate if rate > 0 else None
+    return Forecast(room, state.reskwh, rate, hours_left)
+
+
+class AutoRecharger:
+    """根据耗电速度预测电量耗尽时间，在耗尽前自动充值。
+
+    每一轮对每个付费账户只登陆一次，查询电表和充值都在同一个会话中完成。
+    充值到账后电表可能要过一段时间才更新，同一房间在 cooldown 秒内充值过（预写日志或充值记录中）时不再充值；
+    cooldown 默认为检查间隔下限的两倍，且不短于预写日志的核对窗口。
+    """
+
+    def __init__(
+        self,
+        rooms: List[ManagedRoom],
+        store: MeterStore,
+        proxy_config=None,
+        history=None,
+        window_hours: float = 72,
+        min_interval: float = 600,
+        max_interval: float = 6 * 3600,
+        cache: Optional[SessionCache] = default_session_cache,
+        journal: Optional[RechargeJournal] = default_recharge_journal,
+        room_cache: Optional[RoomCache] = default_room_cache,
+        cooldown: Optional[float] = None,
+    ) -> None:
+        self.rooms = rooms
+        self.store = store
+        self.proxy_config = proxy_config
+        self.history = history
+        self.window_hours = window_hours
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cache = cache
+        self.journal = journal
+        self.room_cache = room_cache
+        if cooldown is None:
+            cooldown = max(2 * min_interval, journal.window if journal is not None else 0)
+        self.cooldown = cooldown
+        self._stop = threading.Event()
+
+    def _recently_recharged(self, account: str, room: ManagedRoom) -> bool:
+        since = time.time() - self.cooldown
+        if self.journal is not None:
+            last = self.journal.last_recharge(account, room.building, room.room)
+            if last is not None and last >= since:
+                return True
+        if self.history is not None:
+            last = self.history.last_recharge(account, room.building, room.room)
+            if last is not None and last.timestamp() >= since:
+                return True
+        return False
+
+    def _run_account(self, account: str, rooms: List[ManagedRoom]) -> List[Forecast]:
+        em, _ = open_management(account, rooms[0].password, self.proxy_config, self.cache)
+        with polling():
+            state = em.meter_state
+        self.store.append(account, state)
+        readings = self.store.query(account, datetime.now() - timedelta(hours=self.window_hours))
+        own = em.my_room(account, self.room_cache)
+        forecasts = []
+        managed = False
+        for room in rooms:
+            if not room.building or not room.room:
+                room = replace(room, building=own[0], room=own[1])
+            if (room.building, room.room) != own:
+                # 电表状态只反映本人宿舍，不能用来预测其他房间。
+                forecasts.append(Forecast(room, 0.0, 0.0, None,
+                                          error=f"不是账户 {account} 本人的宿舍 {own[0]}-{own[1]}，无法预测"))
+                continue
+            if managed:
+                forecasts.append(Forecast(room, 0.0, 0.0, None, error=f"账户 {account} 的宿舍重复托管"))
+                continue
+            managed = True
+            result = forecast(room, state, readings)
+            if result.should_recharge and self._recently_recharged(account, room):
+                result.cooling = True
+            elif result.should_recharge:
+                info = submit_recharge(em, account, room.building, room.room, room.kwh, self.journal)
+                result.recharged = True
+                if self.history is not None:
+                    self.history.add(account, info, room.building, room.room)
+            forecasts.append(result)
+        return forecasts
+
+    def run_cycle(self) -> List[Forecast]:
+        """执行一轮检查，单个账户失败不影响其他账户。"""
+        forecasts = []
+        rooms = sorted(self.rooms, key=lambda r: r.account)
+        for account, group in groupby(rooms, key=lambda r: r.account):
+            group = list(group)
+            try:
+                forecasts.extend(self._run_account(account, group))
+            except Exception as e:
+                forecasts.extend(Forecast(room, 0.0, 0.0, None, error=str(e)) for room in group)
+        return forecasts
+
+    def next_delay(self, forecasts: List[Forecast]) -> float:
+        """根据距离充值阈值最近的房间决定下一轮检查的间隔（秒）。"""
+        delay = self.max_interval
+        for f in forecasts:
+            if f.error:
+                delay = min(delay, self.min_interval)
+            elif f.hours_left is not None:
+                # 在到达阈值前留出一半的余量再检查一次。
+                delay = min(delay, (f.hours_left - f.room.lead_hours) * 3600 / 2)
+        return max(delay, self.min_interval)
+
+    def run_forever(self, report=print) -> None:
+        while not self._stop.is_set():
+            forecasts = self.run_cycle()
+            for f in forecasts:
+                report(format_forecast(f))
+            self._stop.wait(self.next_delay(forecasts))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def format_forecast(f: Forecast) -> str:
+    name = f"{f.room.building}-{f.room.room}"
+    if f.error:
+        return f"❌ {name}: {f.error}"
+    left = "未知" if f.hours_left is None else f"{f.hours_left:.1f}h"
+    action = f"，已充值 {f.room.kwh} 度" if f.recharged else ""
+    if f.cooling:
+        action = "，刚充值过，等待电表到账"
+    return f"🔋 {name}: 剩余 {f.reskwh:.2f} 度，耗电 {f.rate:.3f} 度/h，预计 {left} 后耗尽{action}"
+
+
+def load_rooms(data: List[Dict], lead_hours: Optional[float] = None) -> List[ManagedRoom]:
+    """从对象数组构造托管房间。提供 lead_hours 时作为未单独设置 lead_hours 的房间的默认值。"""
+    defaults = {} if lead_hours is None else {"lead_hours": lead_hours}
+    return [ManagedRoom(**{**defaults, **item}) for item in data]
+
+
+__all__ = (
+    "ManagedRoom",
+    "Forecast",
+    "burn_rate",
+    "forecast",
+    "AutoRecharger",
+    "format_forecast",
+    "load_rooms",
+)
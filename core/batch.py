@@ -0,0 +1,100 @@
+import csv
+import json
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from core.captcha import CaptchaSolver
+from core.electricity import ElectricityManagement, open_management
+from core.recharge_journal import RechargeJournal, default_recharge_journal, submit_recharge
+from core.session_cache import SessionCache, default_session_cache
+from core.util import RechargeUnknownError
+
+
+@dataclass
+class RechargeJob:
+    """一个批量充值任务。"""
+
+    building: str
+    room: str
+    kwh: int
+
+
+@dataclass
+class JobResult:
+    """批量充值任务的执行结果。unknown 表示提交结果未知，之后会对照账单核对，不应立即重试。"""
+
+    job: RechargeJob
+    success: bool
+    error: str = ""
+    unknown: bool = False
+
+
+def load_jobs(path: str) -> List[RechargeJob]:
+    """从 CSV 或 JSON 文件读取充值任务。
+
+    CSV 需要包含 building、room、kwh 三列；JSON 为同样字段的对象数组。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    return [
+        RechargeJob(str(row["building"]).strip(), str(row["room"]).strip(), int(row["kwh"]))
+        for row in rows
+    ]
+
+
+def run_jobs(em: ElectricityManagement, jobs: Iterable[RechargeJob], account: Optional[str] = None,
+             journal: Optional[RechargeJournal] = None) -> List[JobResult]:
+    """在同一个已登陆会话上依次执行充值任务，单个任务失败不影响其他任务。
+
+    同一账户的充值只能串行：每次提交都要在账单中认领对应记录，并发提交会让账单无法区分，
+    预写日志的账户锁也会把它们排成一队。需要并发时按账户拆分，见 `core.multi_account`。
+    """
+
+    def run(job: RechargeJob) -> JobResult:
+        try:
+            if journal is not None:
+                submit_recharge(em, account, job.building, job.room, job.kwh, journal)
+            else:
+                em.recharge(job.building, job.room, job.kwh)
+        except RechargeUnknownError as e:
+            return JobResult(job, False, str(e), unknown=True)
+        except Exception as e:
+            return JobResult(job, False, str(e))
+        return JobResult(job, True)
+
+    return [run(job) for job in jobs]
+
+
+def batch_recharge(
+    username,
+    password,
+    jobs: Iterable[RechargeJob],
+    proxy_config=None,
+    cache: Optional[SessionCache] = default_session_cache,
+    solver: Optional[CaptchaSolver] = None,
+    journal: Optional[RechargeJournal] = default_recharge_journal,
+) -> List[JobResult]:
+    """只登陆一次，依次给多个房间充值，返回每个任务的结果。"""
+    em, service = open_management(username, password, proxy_config, cache, solver=solver)
+    try:
+        return run_jobs(em, jobs, username, journal)
+    finally:
+        if cache is None and service is not None:
+            service.logout()
+
+
+def format_results(results: List[JobResult]) -> str:
+    """把批量充值结果整理成一张文本表格。"""
+    lines = [f"{'楼栋':<6}{'房间':<8}{'度数':>6}  结果"]
+    for r in results:
+        status = "✅" if r.success else f"❌ {r.error}"
+        lines.append(f"{r.job.building:<6}{r.job.room:<8}{r.job.kwh:>6}  {status}")
+    ok = sum(r.success for r in results)
+    lines.append(f"共 {len(results)} 个任务，成功 {ok} 个，失败 {len(results) - ok} 个")
+    return "\n".join(lines)
+
+
+__all__ = ("RechargeJob", "JobResult", "load_jobs", "run_jobs", "batch_recharge", "format_results")
@@ -0,0 +1,140 @@
+import abc
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class CaptchaSolver(abc.ABC):
+    """验证码识别接口，识别失败时返回 None。"""
+
+    # 是否需要等待用户输入；批量任务和守护进程只应使用非交互式的识别方式。
+    interactive = False
+
+    @abc.abstractmethod
+    def solve(self, image: bytes) -> Optional[str]:
+        pass
+
+    def available(self) -> bool:
+        return True
+
+    def prepare(self) -> None:
+        """提前完成耗时的初始化（例如加载模型），可以与其他启动步骤并行执行。"""
+
+
+class OcrSolver(CaptchaSolver):
+    """使用本地 OCR（可选依赖 ddddocr）识别验证码。"""
+
+    def __init__(self) -> None:
+        self._ocr = None
+        self._available = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        if self._available is None:
+            try:
+                import ddddocr  # noqa: F401
+                self._available = True
+            except ImportError:
+                self._available = False
+        return self._available
+
+    def prepare(self) -> None:
+        if not self.available():
+            return
+        with self._lock:
+            if self._ocr is None:
+                import ddddocr
+
+                self._ocr = ddddocr.DdddOcr(show_ad=False)
+
+    def solve(self, image: bytes) -> Optional[str]:
+        if not self.available():
+            return None
+        self.prepare()
+        with self._lock:
+            code = self._ocr.classification(image)
+        return code.strip() or None
+
+
+class InteractiveSolver(CaptchaSolver):
+    """把验证码保存为图片，由用户在终端输入。"""
+
+    interactive = True
+
+    def __init__(self, path: str = "captcha.jpg") -> None:
+        self.path = path
+
+    def solve(self, image: bytes) -> Optional[str]:
+        with open(self.path, "wb") as f:
+            f.write(image)
+        code = input(f"🔐 需要验证码，图片已保存到 {self.path}，请输入:").strip()
+        return code or None
+
+
+class ChainSolver(CaptchaSolver):
+    """依次尝试多个识别方式，返回第一个识别结果。"""
+
+    def __init__(self, solvers: List[CaptchaSolver]) -> None:
+        self.solvers = [s for s in solvers if s.available()]
+        self.interactive = any(s.interactive for s in self.solvers)
+
+    def available(self) -> bool:
+        return len(self.solvers) > 0
+
+    def prepare(self) -> None:
+        for solver in self.solvers:
+            solver.prepare()
+
+    def solve(self, image: bytes) -> Optional[str]:
+        for solver in self.solvers:
+            code = solver.solve(image)
+            if code:
+                return code
+        return None
+
+
+def default_solver(interactive: bool = False) -> ChainSolver:
+    """本地 OCR 优先；interactive 为 True 时再退回到终端输入。"""
+    solvers: List[CaptchaSolver] = [OcrSolver()]
+    if interactive:
+        solvers.append(InteractiveSolver())
+    return ChainSolver(solvers)
+
+
+class NeedCaptchaCache:
+    """在短时间内缓存各账户是否需要验证码，省去每次登陆前的检查请求。"""
+
+    def __init__(self, ttl: float = 300) -> None:
+        self.ttl = ttl
+        self._items: Dict[str, Tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[bool]:
+        with self._lock:
+            item = self._items.get(username)
+            if item is None or item[1] < time.monotonic():
+                self._items.pop(username, None)
+                return None
+            return item[0]
+
+    def set(self, username: str, need: bool) -> None:
+        with self._lock:
+            self._items[username] = (need, time.monotonic() + self.ttl)
+
+    def invalidate(self, username: str) -> None:
+        with self._lock:
+            self._items.pop(username, None)
+
+
+default_need_captcha_cache = NeedCaptchaCache()
+
+
+__all__ = (
+    "CaptchaSolver",
+    "OcrSolver",
+    "InteractiveSolver",
+    "ChainSolver",
+    "default_solver",
+    "NeedCaptchaCache",
+    "default_need_captcha_cache",
+)
@@ -20,16 +20,25 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import itertools
 import time
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable
+from typing import Iterable, Optional, Tuple
 
-from bs4 import BeautifulSoup
-from requests import HTTPError
+from requests import HTTPError, RequestException
 
 from core import auth
-from core.util import AuthServiceError
+from core.captcha import CaptchaSolver, NeedCaptchaCache, default_need_captcha_cache, default_solver
+from core.html_parse import is_auth_page
+from core.metrics import stage, timed
+from core.readiness import Backoff, poll
+from core.recharge_journal import RechargeJournal, default_recharge_journal, submit_recharge
+from core.response_cache import ResponseCache
+from core.scheduler import RequestScheduler, default_scheduler
+from core.session_cache import SessionCache, default_session_cache
+from core.transport import new_session
+from core.util import AuthServiceError, CaptchaError
 
 
 @dataclass
@@ -56,8 +65,15 @@ class RechargeInfo:
     time: datetime
 
 
+_instance_ids = itertools.count()
+
+
 class ElectricityManagement:
-    """能源管理。"""
+    """能源管理。
+
+    所有接口请求都经过 scheduler（`core.scheduler.RequestScheduler`）限速和排队，传入 None 时直接请求。
+    调用 `use_cache` 后电表状态和账单会在短时间内复用缓存的响应。
+    """
 
     home_url = "http://10.50.2.206"
     meter_state_url = "http://10.50.2.206/api/charge/query"
@@ -65,30 +81,49 @@ class ElectricityManagement:
     recharge_url = "http://10.50.2.206/api/charge/Submit"
     get_room_url = "http://10.50.2.206/api/charge/GetRoom"
 
-    def __init__(self, session) -> None:
+    @timed("electricity.home")
+    def __init__(self, session, scheduler: Optional[RequestScheduler] = default_scheduler) -> None:
         self._session = session
+        self._scheduler = scheduler
+        self._cache: Optional[ResponseCache] = None
+        self._cache_key = None
         # if not test_network():
         #     raise VPNError(
         #         "you are not connected to the campus network, please turn on vpn"
         #     )
-        response = self._session.get(self.home_url, allow_redirects=True)
+        response = self._request("home", lambda: self._session.get(self.home_url, allow_redirects=True))
         response.raise_for_status()
-        dom = BeautifulSoup(response.text, features="html.parser")
 
-        if len(dom.select("div[class=auth_page_wrapper]")) > 0:
+        if is_auth_page(response.text):
             raise AuthServiceError("must login first")
 
+    def use_cache(self, cache: Optional[ResponseCache], account: Optional[str] = None) -> "ElectricityManagement":
+        """启用响应缓存并返回自身。提供 account 时同一账户的多个会话共用缓存，否则只在本对象内复用。"""
+        self._cache = cache
+        self._cache_key = account if account is not None else f"session-{next(_instance_ids)}"
+        return self
+
+    def invalidate_cache(self) -> None:
+        if self._cache is not None:
+            self._cache.invalidate(self._cache_key)
+
+    def _request(self, endpoint: str, fn, key=None):
+        if self._scheduler is None:
+            return fn()
+        return self._scheduler.call(endpoint, fn, key=key)
+
+    def _cached(self, endpoint: str, fn):
+        if self._cache is None:
+            return fn()
+        return self._cache.fetch(endpoint, self._cache_key, fn)
+
     @property
+    @timed("electricity.meter_state")
     def meter_state(self) -> MeterState:
-        """获取电表状态。"""
-        response = self._session.get(
-            self.meter_state_url, params={"_dc": int(time.time())}
-        )
-        response.raise_for_status()
-        data = response.json()
+        """获取电表状态。同一会话上并发的查询会合并为一次请求。"""
+        data = self._cached("query", lambda: self._request("query", self._meter_state_data,
+                                                          key=("query", id(self._session))))
 
-        if not data["success"]:
-            raise ValueError("api returned an error")
         recharges = int(data["info"][0]["recharges"])
         reskwh = float(data["info"][0]["reskwh"])
         power = int(data["info"][0]["P"])
@@ -101,15 +136,7 @@ class ElectricityManagement:
     @property
     def recharge_info(self) -> Iterable[RechargeInfo]:
         """获取历次的电表充值账单。"""
-        response = self._session.get(
-            self.recharge_info_url, params={"_dc": int(time.time())}
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        if not data["success"]:
-            raise ValueError("api returned an error")
-        for info in data["info"]:
+        for info in self._recharge_info_data()["info"]:
             oid = int(info["oid"])
             recharge_type = info["type"]
             money = float(info["money"])
@@ -117,63 +144,197 @@ class ElectricityManagement:
             recharge_time = datetime.fromisoformat(info["datetime"])
             yield RechargeInfo(oid, recharge_type, money, quantity, recharge_time)
 
-    def recharge(self, building: str, room: str, kwh: int) -> None:
-        """充值电费。"""
-        response = self._session.post(
-            self.recharge_url,
-            params={"_dc": int(time.time())},
-            data={"building": building, "room": room, "kwh": kwh},
+    def _meter_state_data(self) -> dict:
+        response = self._session.get(
+            self.meter_state_url, params={"_dc": int(time.time())}
         )
         response.raise_for_status()
         data = response.json()
 
+        if not data["success"]:
+            raise ValueError("api returned an error")
+        return data
+
+    @timed("electricity.recharge_info")
+    def _recharge_info_data(self) -> dict:
+        return self._cached("user_account", self._fetch_recharge_info)
+
+    def _fetch_recharge_info(self) -> dict:
+        response = self._request("user_account", lambda: self._session.get(
+            self.recharge_info_url, params={"_dc": int(time.time())}
+        ))
+        response.raise_for_status()
+        data = response.json()
+
+        if not data["success"]:
+            raise ValueError("api returned an error")
+        return data
+
+    @timed("electricity.recharge_table")
+    def recharge_table(self):
+        """以流式解析获取全部账单，返回按列存储的 `core.recharge_table.RechargeTable`。
+
+        不经过响应缓存，也不在内存中保留整个响应，适合记录很多的账户和汇总统计。
+        """
+        from core.recharge_table import RechargeTable, iter_bill_rows
+
+        def fetch():
+            with self._session.get(self.recharge_info_url, params={"_dc": int(time.time())},
+                                   stream=True) as response:
+                response.raise_for_status()
+                return RechargeTable.from_rows(iter_bill_rows(response.iter_content(64 * 1024)))
+
+        return self._request("user_account", fetch)
+
+    @timed("electricity.recharge")
+    def recharge(self, building: str, room: str, kwh: int) -> None:
+        """充值电费。无论结果如何，都会清除电表状态和账单的缓存。"""
+        try:
+            response = self._request("Submit", lambda: self._session.post(
+                self.recharge_url,
+                params={"_dc": int(time.time())},
+                data={"building": building, "room": room, "kwh": kwh},
+            ))
+            response.raise_for_status()
+            data = response.json()
+        finally:
+            self.invalidate_cache()
+
         if not data["success"]:
             raise ValueError(data["info"])
 
-    def recharge_my_room(self, kwh: int) -> None:
-        """给自己的宿舍充值电费。"""
-        response = self._session.get(
+    @timed("electricity.get_room")
+    def get_room(self) -> Tuple[str, str]:
+        """获取登陆账户本人的宿舍（楼栋编码, 房间号）。"""
+        response = self._request("GetRoom", lambda: self._session.get(
             self.get_room_url, params={"_dc": int(time.time())}
-        )
+        ))
         response.raise_for_status()
         data = response.json()
 
         if not data["success"]:
             raise ValueError("api returned an error")
-        self.recharge(data["info"][0]["building"], data["info"][0]["room"], kwh)
+        return data["info"][0]["building"], data["info"][0]["room"]
 
+    def my_room(self, account: Optional[str] = None, cache=None) -> Tuple[str, str]:
+        """同 `get_room`，提供 account 与 cache（`core.room_cache.RoomCache`）时优先使用缓存。"""
+        if account is not None and cache is not None:
+            room = cache.get(account)
+            if room is not None:
+                return room
+        building, room = self.get_room()
+        if account is not None and cache is not None:
+            cache.set(account, building, room)
+        return building, room
 
+    def recharge_my_room(self, kwh: int, account: Optional[str] = None, cache=None) -> None:
+        """给自己的宿舍充值电费。"""
+        building, room = self.my_room(account, cache)
+        self.recharge(building, room, kwh)
+
+
+
+def login_service(username, password, proxy_config=None, site = "http://10.50.2.206:80/",
+                  solver: Optional[CaptchaSolver] = None,
+                  captcha_cache: Optional[NeedCaptchaCache] = default_need_captcha_cache):
 
-def login_service(username, password, proxy_config=None, site = "http://10.50.2.206:80/"):
+    """执行登陆，然后返回service对象
 
-    """执行登陆，然后返回service对象"""
+    solver 默认只使用非交互式的本地识别；需要验证码却无法识别时抛出 CaptchaError，不会提交登陆表单。
+    """
 
     # service 必须与下面一行所展示的精确相符，都为 22 个字符！
     service = auth.AuthService(username, password, proxy_config=proxy_config, service=site, renew="true")
-    # 是否需要输入验证码？
-    if service.need_captcha():
-        # 获取并保存验证码:
-        with open("captcha.jpg", "wb") as captcha_image:
-            captcha_image.write(service.get_captcha_image())
+    # 是否需要输入验证码？短时间内的检查结果会被缓存。
+    cached = captcha_cache.get(username) if captcha_cache is not None else None
+    need_captcha = service.need_captcha(cached)
+    if captcha_cache is not None and cached is None:
+        captcha_cache.set(username, need_captcha)
+    if need_captcha:
+        solver = solver if solver is not None else default_solver()
+        code = solver.solve(service.get_captcha_image()) if solver.available() else None
+        if not code:
+            raise CaptchaError("captcha required but no solver could answer it")
         # 填写验证码:
-        service.set_captcha_code("验证码")
+        service.set_captcha_code(code)
     # 登陆:
     try:
         service.login()
     except HTTPError as e:
         print(e)
+    except AuthServiceError:
+        # 登陆失败后服务端可能开始要求验证码，下次重新检查。
+        if captcha_cache is not None:
+            captcha_cache.invalidate(username)
+        raise
     return service
 
-def pay_electricity(username, password, building_code, room, amount, proxy_config=None, delay = 3)->RechargeInfo:
-    """根据房间号和金额充值电费以及用户，并返回充值信息"""
-    service = login_service(username, password, proxy_config)
-    time.sleep(delay)
-    em = ElectricityManagement(service.session)
-    # 充值电费
-    em.recharge(building_code, room, amount)
-    # 获取历次的电表充值账单：
-    all_payments = list(em.recharge_info)
-    service.logout()
-    return all_payments[0]
-
-__all__ = ("ElectricityManagement",)
\ No newline at end of file
+@timed("electricity.wait_ready")
+def wait_for_management(session, timeout: float = 10, backoff: Optional[Backoff] = None) -> ElectricityManagement:
+    """登陆后轮询能源管理主页，直到会话可用，代替固定时长的等待。
+
+    只有网络错误会重试；返回登陆页等明确的登陆失败（AuthServiceError）立即抛出。
+    """
+    result = []
+
+    def check() -> bool:
+        result.append(ElectricityManagement(session))
+        return True
+
+    if poll(check, time.monotonic() + timeout, backoff, retry_on=(RequestException,))[0]:
+        return result[-1]
+    # 超时后再试一次，让真实的异常抛给调用者。
+    return ElectricityManagement(session)
+
+
+def open_management(
+    username,
+    password,
+    proxy_config=None,
+    cache: Optional[SessionCache] = None,
+    ready_timeout: float = 10,
+    solver: Optional[CaptchaSolver] = None,
+) -> Tuple[ElectricityManagement, Optional[auth.AuthService]]:
+    """获取一个已登陆的能源管理对象。
+
+    若提供了 cache，则先尝试复用缓存的会话，只有校验失败时才重新登陆。
+    第二个返回值是本次新建的登陆服务，复用缓存时为 None。
+    """
+    if cache is not None:
+        session = new_session(proxy_config)
+        if cache.load(username, session):
+            try:
+                with stage("session_cache.validate"):
+                    em = ElectricityManagement(session)
+                cache.save(username, session)
+                return em, None
+            except (AuthServiceError, RequestException):
+                cache.invalidate(username)
+
+    service = login_service(username, password, proxy_config, solver=solver)
+    em = wait_for_management(service.session, ready_timeout)
+    if cache is not None:
+        cache.save(username, service.session)
+    return em, service
+
+
+def pay_electricity(username, password, building_code, room, amount, proxy_config=None, ready_timeout = 10,
+                    cache: Optional[SessionCache] = default_session_cache, history=None,
+                    solver: Optional[CaptchaSolver] = None,
+                    journal: Optional[RechargeJournal] = default_recharge_journal)->RechargeInfo:
+    """根据房间号和金额充值电费以及用户，并返回充值信息
+
+    若提供了 history（`core.history_store.HistoryStore`），本次充值会连同房间信息记入本地账单缓存。
+    提供 journal 时充值意图先写入预写日志，提交结果不明确时对照账单确认，不会重复扣款。
+    """
+    em, service = open_management(username, password, proxy_config, cache, ready_timeout, solver)
+    # 充值电费，并在账单中找到本次充值对应的记录：
+    latest = submit_recharge(em, username, building_code, room, amount, journal)
+    if history is not None:
+        history.add(username, latest, building_code, room)
+    # 使用会话缓存时不退出登陆，否则缓存的 cookie 会立即失效。
+    if cache is None and service is not None:
+        service.logout()
+    return latest
+
+__all__ = ("ElectricityManagement", "wait_for_management", "open_management", "pay_electricity")
@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.electricity import RechargeInfo
+from core.util import connect_db
+
+
+history_store_path = "data/history.db"
+
+
+class HistoryStore:
+    """本地充值账单缓存，以 `RechargeInfo.oid` 为主键。
+
+    账单接口按时间倒序返回，增量同步时遇到第一条已同步过的 oid 就停止。
+    接口返回的账单不包含房间信息，通过本程序充值的记录会额外标注楼栋和房间；
+    这些记录由 `add` 直接写入，未标记为已同步，不会让同步提前停止而漏掉两次同步之间的其他账单。
+    """
+
+    def __init__(self, path: str = history_store_path) -> None:
+        self._conn = connect_db(path)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recharge_history ("
+                "oid INTEGER PRIMARY KEY, account TEXT NOT NULL, type TEXT NOT NULL, "
+                "money REAL NOT NULL, quantity INTEGER NOT NULL, ts REAL NOT NULL, "
+                "building TEXT, room TEXT, synced INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(recharge_history)")}
+            if "synced" not in columns:
+                # 旧版本的缓存没有同步标记，下次同步时会完整核对一遍账单。
+                self._conn.execute("ALTER TABLE recharge_history ADD COLUMN synced INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS recharge_history_account_ts ON recharge_history (account, ts)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS recharge_history_room ON recharge_history (building, room)"
+            )
+
+    def has(self, oid: int) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM recharge_history WHERE oid = ?", (oid,)).fetchone()
+        return row is not None
+
+    def _synced(self, oid: int) -> Optional[bool]:
+        """oid 是否已经同步过，不存在时返回 None。"""
+        with self._lock:
+            row = self._conn.execute("SELECT synced FROM recharge_history WHERE oid = ?", (oid,)).fetchone()
+        return None if row is None else bool(row[0])
+
+    def add(self, account: str, info: RechargeInfo, building: Optional[str] = None,
+            room: Optional[str] = None) -> None:
+        """写入一条账单；已存在时只补充房间信息。"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO recharge_history (oid, account, type, money, quantity, ts, building, room) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(oid) DO UPDATE SET "
+                "building = COALESCE(excluded.building, building), room = COALESCE(excluded.room, room)",
+                (info.oid, account, info.type, info.money, info.quantity, info.time.timestamp(),
+                 building, room),
+            )
+
+    def sync(self, account: str, infos: Iterable[RechargeInfo]) -> List[RechargeInfo]:
+        """增量同步账单，返回新增的记录（按时间倒序）。"""
+        seen, new = [], []
+        for info in infos:
+            synced = self._synced(info.oid)
+            if synced:
+                break
+            seen.append(info)
+            if synced is None:
+                new.append(info)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO recharge_history (oid, account, type, money, quantity, ts, synced) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1) ON CONFLICT(oid) DO UPDATE SET synced = 1",
+                [(i.oid, account, i.type, i.money, i.quantity, i.time.timestamp()) for i in seen],
+            )
+        return new
+
+    def recent(self, account: str, limit: int = 20) -> List[RechargeInfo]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT oid, type, money, quantity, ts FROM recharge_history "
+                "WHERE account = ? ORDER BY ts DESC LIMIT ?",
+                (account, limit),
+            ).fetchall()
+        return [RechargeInfo(r[0], r[1], r[2], r[3], datetime.fromtimestamp(r[4])) for r in rows]
+
+    def last_recharge(self, account: str, building: str, room: str) -> Optional[datetime]:
+        """该房间最近一条已标注房间的账单时间，没有时返回 None。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(ts) FROM recharge_history WHERE account = ? AND building = ? AND room = ?",
+                (account, building, room),
+            ).fetchone()
+        return None if row[0] is None else datetime.fromtimestamp(row[0])
+
+    def spend_by_month(self, account: Optional[str] = None) -> Dict[str, float]:
+        """按月份（YYYY-MM，本地时区）统计充值金额。"""
+        sql = "SELECT strftime('%Y-%m', ts, 'unixepoch', 'localtime') AS month, SUM(money) FROM recharge_history"
+        args: Tuple = ()
+        if account is not None:
+            sql += " WHERE account = ?"
+            args = (account,)
+        sql += " GROUP BY month ORDER BY month"
+        with self._lock:
+            return dict(self._conn.execute(sql, args).fetchall())
+
+    def spend_by_room(self, account: Optional[str] = None) -> Dict[Tuple[str, str], float]:
+        """按 (楼栋, 房间) 统计充值金额，未标注房间的账单不计入。"""
+        sql = "SELECT building, room, SUM(money) FROM recharge_history WHERE building IS NOT NULL"
+        args: Tuple = ()
+        if account is not None:
+            sql += " AND account = ?"
+            args = (account,)
+        sql += " GROUP BY building, room ORDER BY building, room"
+        with self._lock:
+            return {(b, r): money for b, r, money in self._conn.execute(sql, args).fetchall()}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+__all__ = ("HistoryStore",)
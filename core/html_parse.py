@@ -0,0 +1,131 @@
+import os
+from html.parser import HTMLParser
+from typing import Dict, Tuple
+
+# 可选的解析后端：scan（标准库流式扫描，默认）、lxml（需安装 lxml）、bs4（BeautifulSoup）。
+# 通过环境变量 FEE_HTML_PARSER 指定，指定的后端不可用时退回 bs4。
+DEFAULT_BACKEND = os.getenv("FEE_HTML_PARSER", "scan")
+
+
+class _LoginFormScanner(HTMLParser):
+    """只提取隐藏 input 字段和 `div#msg.errors` 的流式扫描器，不构建文档树。"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.hidden: Dict[str, str] = {}
+        self.has_error = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "input":
+            attrs = dict(attrs)
+            if (attrs.get("type") or "").lower() == "hidden" and attrs.get("name"):
+                self.hidden[attrs["name"]] = attrs.get("value") or ""
+        elif tag == "div":
+            attrs = dict(attrs)
+            if attrs.get("id") == "msg" and "errors" in (attrs.get("class") or "").split():
+                self.has_error = True
+
+    handle_startendtag = handle_starttag
+
+
+class _AuthPageScanner(HTMLParser):
+    """查找 class 恰好为 auth_page_wrapper 的 div，找到后忽略剩余内容。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.found = False
+
+    def handle_starttag(self, tag, attrs):
+        if not self.found and tag == "div" and dict(attrs).get("class") == "auth_page_wrapper":
+            self.found = True
+
+
+def _scan_login_form(html: str) -> Tuple[Dict[str, str], bool]:
+    scanner = _LoginFormScanner()
+    scanner.feed(html)
+    scanner.close()
+    return scanner.hidden, scanner.has_error
+
+
+def _scan_auth_page(html: str) -> bool:
+    # 绝大多数情况下页面里根本没有这个类名，可以直接跳过解析。
+    if "auth_page_wrapper" not in html:
+        return False
+    scanner = _AuthPageScanner()
+    scanner.feed(html)
+    scanner.close()
+    return scanner.found
+
+
+def _lxml_login_form(html: str) -> Tuple[Dict[str, str], bool]:
+    from lxml import html as lxml_html
+
+    dom = lxml_html.fromstring(html)
+    hidden = {
+        e.get("name"): e.get("value") or ""
+        for e in dom.xpath('//input[translate(@type, "HIDEN", "hiden")="hidden"][@name]')
+    }
+    errors = dom.xpath('//div[@id="msg"][contains(concat(" ", normalize-space(@class), " "), " errors ")]')
+    return hidden, len(errors) > 0
+
+
+def _lxml_auth_page(html: str) -> bool:
+    from lxml import html as lxml_html
+
+    if "auth_page_wrapper" not in html:
+        return False
+    return len(lxml_html.fromstring(html).xpath('//div[@class="auth_page_wrapper"]')) > 0
+
+
+def _bs4_login_form(html: str) -> Tuple[Dict[str, str], bool]:
+    from bs4 import BeautifulSoup
+
+    dom = BeautifulSoup(html, features="html.parser")
+    hidden = {
+        e.attrs["name"]: e.attrs.get("value", "")
+        for e in dom.select("input[type=hidden]")
+        if "name" in e.attrs
+    }
+    return hidden, len(dom.select("div#msg.errors")) > 0
+
+
+def _bs4_auth_page(html: str) -> bool:
+    from bs4 import BeautifulSoup
+
+    dom = BeautifulSoup(html, features="html.parser")
+    return len(dom.select("div[class=auth_page_wrapper]")) > 0
+
+
+BACKENDS = {
+    "scan": (_scan_login_form, _scan_auth_page),
+    "lxml": (_lxml_login_form, _lxml_auth_page),
+    "bs4": (_bs4_login_form, _bs4_auth_page),
+}
+
+
+def _backend(name):
+    name = name or DEFAULT_BACKEND
+    if name == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            name = "bs4"
+    if name not in BACKENDS:
+        raise ValueError(f"unknown html parser backend: {name}")
+    return BACKENDS[name]
+
+
+def parse_login_form(html: str, backend: str = None) -> Tuple[Dict[str, str], bool]:
+    """解析统一身份认证登陆页。
+
+    返回 (隐藏 input 字段的 name -> value, 页面是否包含 `div#msg.errors`)。
+    """
+    return _backend(backend)[0](html)
+
+
+def is_auth_page(html: str, backend: str = None) -> bool:
+    """判断页面是否为需要登陆的认证页（包含 `div.auth_page_wrapper`）。"""
+    return _backend(backend)[1](html)
+
+
+__all__ = ("BACKENDS", "parse_login_form", "is_auth_page")
@@ -0,0 +1,165 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from core.electricity import MeterState
+from core.util import connect_db
+
+
+meter_store_path = "data/meter.db"
+
+BUCKETS = ("hour", "day")
+
+
+@dataclass
+class MeterReading:
+    """一次电表采样。"""
+
+    account: str
+    time: datetime
+    reskwh: float
+    power: int
+    voltage: int
+    power_factor: float
+
+
+@dataclass
+class MeterAggregate:
+    """一段时间内电表采样的汇总。"""
+
+    start: datetime
+    samples: int
+    min_reskwh: float
+    max_reskwh: float
+    avg_power: float
+    consumption: float
+
+
+def consumption_of(readings: List[MeterReading]) -> float:
+    """根据剩余电量的下降量计算用电量，剩余电量上升（充值）的区间不计入。"""
+    used = 0.0
+    for prev, cur in zip(readings, readings[1:]):
+        if cur.reskwh < prev.reskwh:
+            used += prev.reskwh - cur.reskwh
+    return used
+
+
+class MeterStore:
+    """本地电表读数时序库，按 (account, ts) 建立索引。"""
+
+    def __init__(self, path: str = meter_store_path) -> None:
+        self._conn = connect_db(path)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meter_readings ("
+                "account TEXT NOT NULL, ts REAL NOT NULL, reskwh REAL NOT NULL, "
+                "power INTEGER NOT NULL, voltage INTEGER NOT NULL, power_factor REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS meter_readings_account_ts ON meter_readings (account, ts)"
+            )
+
+    def append(self, account: str, state: MeterState, ts: Optional[float] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO meter_readings VALUES (?, ?, ?, ?, ?, ?)",
+                (account, time.time() if ts is None else ts, state.reskwh, state.power,
+                 state.voltage, state.power_factor),
+            )
+
+    def query(self, account: str, start: datetime, end: Optional[datetime] = None) -> List[MeterReading]:
+        """按时间顺序返回 [start, end) 内的读数。"""
+        end_ts = time.time() + 1 if end is None else end.timestamp()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, reskwh, power, voltage, power_factor FROM meter_readings "
+                "WHERE account = ? AND ts >= ? AND ts < ? ORDER BY ts",
+                (account, start.timestamp(), end_ts),
+            ).fetchall()
+        return [MeterReading(account, datetime.fromtimestamp(r[0]), *r[1:]) for r in rows]
+
+    def latest(self, account: str, limit: int = 1) -> List[MeterReading]:
+        """返回最近的 limit 条读数，按时间倒序。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, reskwh, power, voltage, power_factor FROM meter_readings "
+                "WHERE account = ? ORDER BY ts DESC LIMIT ?",
+                (account, limit),
+            ).fetchall()
+        return [MeterReading(account, datetime.fromtimestamp(r[0]), *r[1:]) for r in rows]
+
+    def downsample(self, account: str, start: datetime, end: Optional[datetime] = None,
+                   bucket: str = "hour") -> List[MeterAggregate]:
+        """把读数按小时（hour）或天（day，按本地时区划分）聚合。"""
+        if bucket not in BUCKETS:
+            raise ValueError(f"unknown bucket: {bucket}")
+        groups = {}
+        used = {}
+        prev = None
+        for reading in self.query(account, start, end):
+            key = reading.time.replace(minute=0, second=0, microsecond=0)
+            if bucket == "day":
+                key = key.replace(hour=0)
+            groups.setdefault(key, []).append(reading)
+            # 跨越桶边界的下降量计入后一个桶，保证各桶用电量之和等于总用电量。
+            drop = 0.0 if prev is None else max(prev.reskwh - reading.reskwh, 0.0)
+            used[key] = used.get(key, 0.0) + drop
+            prev = reading
+        return [
+            MeterAggregate(
+                key,
+                len(items),
+                min(r.reskwh for r in items),
+                max(r.reskwh for r in items),
+                sum(r.power for r in items) / len(items),
+                used[key],
+            )
+            for key, items in groups.items()
+        ]
+
+    def consumption(self, account: str, start: datetime, end: Optional[datetime] = None) -> float:
+        """计算一段时间内的用电量（kWh）。"""
+        return consumption_of(self.query(account, start, end))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class MeterPoller:
+    """按固定间隔采样电表状态并写入 MeterStore。"""
+
+    def __init__(self, fetch: Callable[[], MeterState], store: MeterStore, account: str,
+                 interval: float = 600) -> None:
+        self.fetch = fetch
+        self.store = store
+        self.account = account
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self) -> Optional[MeterState]:
+        try:
+            state = self.fetch()
+        except Exception as e:
+            print(f"⚠️ 电表采样失败: {e}")
+            return None
+        self.store.append(self.account, state)
+        return state
+
+    def run_forever(self) -> None:
+        self.sample()
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run_forever, name="meter-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+__all__ = ("MeterReading", "MeterAggregate", "MeterStore", "MeterPoller", "consumption_of")
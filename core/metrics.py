@@ -0,0 +1,164 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional
+
+
+metrics_path = "data/metrics.jsonl"
+
+
+@dataclass
+class StageRecord:
+    """一次阶段执行的耗时与结果。"""
+
+    stage: str
+    ts: float
+    duration: float
+    ok: bool
+    error: str = ""
+
+
+class Recorder:
+    """记录各阶段的耗时，写入内存并追加到 JSON lines 文件。
+
+    文件超过 max_bytes 后改名为 `<path>.1`（覆盖上一份）并重新开始，磁盘上最多保留约两倍 max_bytes 的记录。
+    设置环境变量 FEE_METRICS=0 可关闭文件写入。
+    """
+
+    def __init__(self, path: Optional[str] = metrics_path, keep: int = 1000,
+                 max_bytes: int = 1024 * 1024) -> None:
+        self.path = path if os.getenv("FEE_METRICS", "1") != "0" else None
+        self.max_bytes = max_bytes
+        self.records = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def record(self, record: StageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            if self.path is None:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+                size = f.tell()
+            if size > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        ts = time.time()
+        try:
+            yield
+        except BaseException as e:
+            self.record(StageRecord(name, ts, time.perf_counter() - start, False, type(e).__name__))
+            raise
+        self.record(StageRecord(name, ts, time.perf_counter() - start, True))
+
+    def timed(self, name: str):
+        """把函数的每次调用记录为一个阶段的装饰器。"""
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+
+default_recorder = Recorder()
+stage = default_recorder.stage
+timed = default_recorder.timed
+
+
+def load_records(path: str = metrics_path, last: Optional[int] = None) -> List[StageRecord]:
+    """读取 JSON lines 文件（连同轮转出的 `<path>.1`）中的记录，last 指定只保留最后多少条。"""
+    records = deque(maxlen=last)
+    for name in (path + ".1", path):
+        try:
+            with open(name, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        records.append(StageRecord(**json.loads(line)))
+        except FileNotFoundError:
+            pass
+    return list(records)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(records: Iterable[StageRecord]) -> Dict[str, dict]:
+    """按阶段汇总次数、失败数和耗时分位数。"""
+    groups: Dict[str, List[StageRecord]] = {}
+    for r in records:
+        groups.setdefault(r.stage, []).append(r)
+    result = {}
+    for name, items in sorted(groups.items()):
+        durations = sorted(r.duration for r in items)
+        result[name] = {
+            "count": len(items),
+            "failures": sum(not r.ok for r in items),
+            "sum": sum(durations),
+            "p50": percentile(durations, 0.5),
+            "p90": percentile(durations, 0.9),
+            "p99": percentile(durations, 0.99),
+            "max": durations[-1],
+        }
+    return result
+
+
+def prometheus_text(records: Iterable[StageRecord]) -> str:
+    """导出为 Prometheus 文本格式（可供 node_exporter 的 textfile collector 读取）。"""
+    lines = [
+        "# HELP fee_stage_duration_seconds Duration of each recharge stage.",
+        "# TYPE fee_stage_duration_seconds summary",
+    ]
+    summary = summarize(records)
+    for name, s in summary.items():
+        for q, quantile in (("p50", "0.5"), ("p90", "0.9"), ("p99", "0.99")):
+            lines.append(f'fee_stage_duration_seconds{{stage="{name}",quantile="{quantile}"}} {s[q]:.6f}')
+        lines.append(f'fee_stage_duration_seconds_sum{{stage="{name}"}} {s["sum"]:.6f}')
+        lines.append(f'fee_stage_duration_seconds_count{{stage="{name}"}} {s["count"]}')
+    lines.append("# HELP fee_stage_failures_total Failed executions of each recharge stage.")
+    lines.append("# TYPE fee_stage_failures_total counter")
+    for name, s in summary.items():
+        lines.append(f'fee_stage_failures_total{{stage="{name}"}} {s["failures"]}')
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(summary: Dict[str, dict]) -> str:
+    lines = [f"{'阶段':<26}{'次数':>6}{'失败':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"]
+    for name, s in summary.items():
+        lines.append(
+            f"{name:<28}{s['count']:>6}{s['failures']:>6}"
+            f"{s['p50']:>9.3f}s{s['p90']:>9.3f}s{s['p99']:>9.3f}s{s['max']:>9.3f}s"
+        )
+    return "\n".join(lines)
+
+
+__all__ = (
+    "StageRecord",
+    "Recorder",
+    "default_recorder",
+    "stage",
+    "timed",
+    "load_records",
+    "summarize",
+    "prometheus_text",
+    "format_summary",
+)
@@ -0,0 +1,161 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional
+
+from core.auto_recharge import ManagedRoom
+from core.batch import JobResult, RechargeJob
+from core.captcha import CaptchaSolver
+from core.electricity import open_management
+from core.profile_store import ProfileStore
+from core.recharge_journal import RechargeJournal, default_recharge_journal, submit_recharge
+from core.room_cache import RoomCache, default_room_cache
+from core.session_cache import SessionCache, default_session_cache
+
+
+@dataclass
+class AccountJobs:
+    """同一个付费账户下的充值任务。楼栋或房间号留空表示该账户本人的宿舍。"""
+
+    account: str
+    password: str
+    jobs: List[RechargeJob] = field(default_factory=list)
+
+
+@dataclass
+class AccountResult:
+    """一个付费账户的执行结果。error 非空表示登陆阶段失败，所有任务均未执行。"""
+
+    account: str
+    results: List[JobResult]
+    error: str = ""
+    elapsed: float = 0.0
+
+
+def group_rooms(rooms: Iterable[ManagedRoom]) -> List[AccountJobs]:
+    """把房间列表（同 `auto --rooms` 的文件格式）按付费账户分组。"""
+    rooms = sorted(rooms, key=lambda r: r.account)
+    return [
+        AccountJobs(account, group[0].password, [RechargeJob(r.building, r.room, r.kwh) for r in group])
+        for account, group in ((a, list(g)) for a, g in groupby(rooms, key=lambda r: r.account))
+    ]
+
+
+def jobs_from_profiles(store: ProfileStore, names: Optional[Iterable[str]] = None) -> List[AccountJobs]:
+    """按配置库中的充值配置生成任务，每个房间使用其配置的付费账户。"""
+    names = None if names is None else set(names)
+    grouped: Dict[str, AccountJobs] = {}
+    for record in store.find_rooms():
+        if names is not None and record["name"] not in names:
+            continue
+        payer = store.get("payer", record["payer"]) if record["payer"] else store.get("payer")
+        if payer is None or not payer["username"] or not record["amount"]:
+            continue
+        item = grouped.setdefault(payer["username"], AccountJobs(payer["username"], payer["password"]))
+        item.jobs.append(RechargeJob(record["building_code"] or "", record["room"] or "", int(record["amount"])))
+    return list(grouped.values())
+
+
+class AccountRateLimiter:
+    """按账户限速：同一账户相邻两次请求至少间隔 min_interval 秒，不同账户互不影响。"""
+
+    def __init__(self, min_interval: float = 1.0) -> None:
+        self.min_interval = min_interval
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, account: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next.get(account, now))
+            self._next[account] = at + self.min_interval
+        if at > now:
+            time.sleep(at - now)
+
+
+class MultiAccountExecutor:
+    """多个付费账户并发登陆与充值。
+
+    每个账户使用独立的会话（共用同一个 SOCKS5 隧道），账户内的任务依次提交并按账户限速；
+    同时进行的账户数不超过 max_concurrency。
+    """
+
+    def __init__(
+        self,
+        proxy_config=None,
+        max_concurrency: int = 8,
+        min_interval: float = 1.0,
+        cache: Optional[SessionCache] = default_session_cache,
+        journal: Optional[RechargeJournal] = default_recharge_journal,
+        room_cache: Optional[RoomCache] = default_room_cache,
+        solver: Optional[CaptchaSolver] = None,
+    ) -> None:
+        self.proxy_config = proxy_config
+        self.max_concurrency = max_concurrency
+        self.limiter = AccountRateLimiter(min_interval)
+        self.cache = cache
+        self.journal = journal
+        self.room_cache = room_cache
+        self.solver = solver
+
+    def run_account(self, item: AccountJobs) -> AccountResult:
+        start = time.perf_counter()
+        try:
+            self.limiter.wait(item.account)
+            em, service = open_management(item.account, item.password, self.proxy_config, self.cache,
+                                          solver=self.solver)
+        except Exception as e:
+            results = [JobResult(job, False, f"登陆失败: {e}") for job in item.jobs]
+            return AccountResult(item.account, results, str(e), time.perf_counter() - start)
+        results = []
+        try:
+            for job in item.jobs:
+                try:
+                    if not job.building or not job.room:
+                        job = RechargeJob(*em.my_room(item.account, self.room_cache), job.kwh)
+                    self.limiter.wait(item.account)
+                    submit_recharge(em, item.account, job.building, job.room, job.kwh, self.journal)
+                    results.append(JobResult(job, True))
+                except Exception as e:
+                    results.append(JobResult(job, False, str(e)))
+        finally:
+            if self.cache is None and service is not None:
+                service.logout()
+        return AccountResult(item.account, results, elapsed=time.perf_counter() - start)
+
+    def run(self, items: Iterable[AccountJobs]) -> List[AccountResult]:
+        """并发执行所有账户的任务，结果顺序与输入一致，单个账户失败不影响其他账户。"""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as executor:
+            return list(executor.map(self.run_account, items))
+
+
+def format_report(results: List[AccountResult]) -> str:
+    """把多账户充值结果汇总成一张文本表格。"""
+    lines = [f"{'账户':<14}{'楼栋':<6}{'房间':<8}{'度数':>6}  结果"]
+    jobs = ok = 0
+    for r in results:
+        for j in r.results:
+            status = "✅" if j.success else f"❌ {j.error}"
+            lines.append(f"{r.account:<14}{j.job.building:<6}{j.job.room:<8}{j.job.kwh:>6}  {status}")
+        jobs += len(r.results)
+        ok += sum(j.success for j in r.results)
+    slowest = max((r.elapsed for r in results), default=0.0)
+    lines.append(f"共 {len(results)} 个账户、{jobs} 个任务，成功 {ok} 个，失败 {jobs - ok} 个，"
+                 f"最慢账户用时 {slowest:.2f}s")
+    return "\n".join(lines)
+
+
+__all__ = (
+    "AccountJobs",
+    "AccountResult",
+    "group_rooms",
+    "jobs_from_profiles",
+    "AccountRateLimiter",
+    "MultiAccountExecutor",
+    "format_report",
+)
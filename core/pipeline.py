@@ -0,0 +1,128 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.metrics import StageRecord, default_recorder
+
+
+@dataclass
+class Stage:
+    """流水线中的一个阶段。fn 接收各依赖阶段的返回值 {阶段名: 返回值}。"""
+
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageRun:
+    """阶段的执行结果，start/end 为相对流水线开始的秒数。依赖失败时阶段被跳过，不会执行。"""
+
+    name: str
+    deps: Tuple[str, ...]
+    start: float = 0.0
+    end: float = 0.0
+    ok: bool = False
+    skipped: bool = False
+    error: str = ""
+    value: Any = field(default=None, repr=False)
+
+    @property
+    def elapsed(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class PipelineReport:
+    runs: Dict[str, StageRun] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return max((r.end for r in self.runs.values()), default=0.0)
+
+    def ok(self, *names: str) -> bool:
+        return all(name in self.runs and self.runs[name].ok for name in names)
+
+    def value(self, name: str, default=None):
+        run = self.runs.get(name)
+        return run.value if run is not None and run.ok else default
+
+    def critical_path(self, target: Optional[str] = None) -> List[StageRun]:
+        """从最后结束（或指定）的阶段出发，沿最晚结束的依赖回溯得到的关键路径。"""
+        runs = [r for r in self.runs.values() if not r.skipped]
+        if not runs:
+            return []
+        run = self.runs[target] if target else max(runs, key=lambda r: r.end)
+        path = [run]
+        while run.deps:
+            run = max((self.runs[d] for d in run.deps), key=lambda r: r.end)
+            path.append(run)
+        return path[::-1]
+
+    def __str__(self) -> str:
+        parts = [f"{r.name} {'✅' if r.ok else '❌'} {r.elapsed:.2f}s" for r in self.critical_path()]
+        return " → ".join(parts) + f"（共 {self.elapsed:.2f}s）"
+
+
+class Pipeline:
+    """按依赖关系并行执行各阶段：依赖全部成功的阶段立即开始，互不依赖的阶段同时进行。
+
+    每个阶段的耗时记为 `pipeline.<阶段名>`。
+    """
+
+    def __init__(self, stages: Iterable[Stage], max_workers: Optional[int] = None) -> None:
+        self.stages = {s.name: s for s in stages}
+        for s in self.stages.values():
+            missing = [d for d in s.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"stage {s.name} depends on unknown stages: {missing}")
+        self.max_workers = max_workers or len(self.stages) or 1
+
+    def _run_stage(self, stage: Stage, report: PipelineReport, origin: float) -> None:
+        run = report.runs[stage.name]
+        ts = time.time()
+        run.start = time.perf_counter() - origin
+        error = ""
+        try:
+            run.value = stage.fn({d: report.runs[d].value for d in stage.deps})
+            run.ok = True
+        except Exception as e:
+            error = type(e).__name__
+            run.error = f"{error}: {e}"
+        run.end = time.perf_counter() - origin
+        default_recorder.record(StageRecord(f"pipeline.{stage.name}", ts, run.elapsed, run.ok, error))
+
+    def run(self) -> PipelineReport:
+        report = PipelineReport({name: StageRun(name, s.deps) for name, s in self.stages.items()})
+        origin = time.perf_counter()
+        pending = dict(self.stages)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                progressed = False
+                for name, stage in list(pending.items()):
+                    if any(d in pending or d in running.values() for d in stage.deps):
+                        continue
+                    del pending[name]
+                    progressed = True
+                    failed = [d for d in stage.deps if not report.runs[d].ok]
+                    if failed:
+                        run = report.runs[name]
+                        run.start = run.end = time.perf_counter() - origin
+                        run.skipped = True
+                        run.error = f"skipped: {', '.join(failed)} failed"
+                        continue
+                    running[executor.submit(self._run_stage, stage, report, origin)] = name
+                if not running:
+                    if pending and not progressed:
+                        raise ValueError(f"dependency cycle among stages: {sorted(pending)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    future.result()
+        return report
+
+
+__all__ = ("Stage", "StageRun", "PipelineReport", "Pipeline")
@@ -0,0 +1,104 @@
+import threading
+from typing import Dict, List, Optional
+
+from core.util import connect_db
+
+
+profile_store_path = "data/profiles.db"
+
+DEFAULT_PROFILE = "default"
+
+# 每类记录对应的表及其字段（name 为主键，不在此列出）。
+TABLES: Dict[str, tuple] = {
+    "payer": ("payers", ("username", "password")),
+    "vpn": ("vpn_users", ("username", "password")),
+    "room": ("rooms", ("building_name", "building_code", "room", "amount", "payer")),
+}
+COLUMN_TYPES = {"amount": "INTEGER"}
+
+
+class ProfileStore:
+    """多账户、多房间的配置库。
+
+    付费账户、VPN 账户和充值房间各占一张表，按名称查找；房间另按 (楼栋编码, 房间号) 建立索引。
+    每次写入都在一个 SQLite 事务中完成。
+    """
+
+    def __init__(self, path: str = profile_store_path) -> None:
+        self._conn = connect_db(path)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            for table, columns in TABLES.values():
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (name TEXT PRIMARY KEY, "
+                    + ", ".join(f"{c} {COLUMN_TYPES.get(c, 'TEXT')}" for c in columns) + ")"
+                )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS rooms_location ON rooms (building_code, room)")
+
+    @staticmethod
+    def _table(kind: str):
+        if kind not in TABLES:
+            raise ValueError(f"unknown profile kind: {kind}")
+        return TABLES[kind]
+
+    def get(self, kind: str, name: str = DEFAULT_PROFILE) -> Optional[dict]:
+        table, columns = self._table(kind)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE name = ?", (name,)
+            ).fetchone()
+        return None if row is None else dict(zip(columns, row))
+
+    def put(self, kind: str, record: dict, name: str = DEFAULT_PROFILE) -> None:
+        table, columns = self._table(kind)
+        values = [record.get(c) for c in columns]
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {table} (name, {', '.join(columns)}) "
+                f"VALUES (?, {', '.join('?' for _ in columns)})",
+                [name, *values],
+            )
+
+    def delete(self, kind: str, name: str) -> None:
+        table, _ = self._table(kind)
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {table} WHERE name = ?", (name,))
+
+    def names(self, kind: str) -> List[str]:
+        table, _ = self._table(kind)
+        with self._lock:
+            return [r[0] for r in self._conn.execute(f"SELECT name FROM {table} ORDER BY name")]
+
+    def find_rooms(self, building_code: Optional[str] = None, room: Optional[str] = None) -> List[dict]:
+        """按楼栋编码和/或房间号查找房间配置，结果包含 name 字段。"""
+        _, columns = TABLES["room"]
+        sql = f"SELECT name, {', '.join(columns)} FROM rooms WHERE 1 = 1"
+        args = []
+        if building_code is not None:
+            sql += " AND building_code = ?"
+            args.append(building_code)
+        if room is not None:
+            sql += " AND room = ?"
+            args.append(room)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY name", args).fetchall()
+        return [dict(zip(("name", *columns), row)) for row in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_profile_store() -> ProfileStore:
+    """首次使用时才打开默认配置库。"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ProfileStore()
+        return _default_store
+
+
+__all__ = ("DEFAULT_PROFILE", "ProfileStore", "default_profile_store")
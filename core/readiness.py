@@ -0,0 +1,136 @@
+import socket
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple, Type
+
+from core.metrics import StageRecord, default_recorder
+from core.scheduler import PRIORITY_POLL, RequestScheduler, default_scheduler
+from core.transport import shared_session
+from core.util import test_network
+
+
+SOCKS_HOST = "127.0.0.1"
+SOCKS_PORT = 1080
+ELECTRICITY_HOME_URL = "http://10.50.2.206"
+
+
+@dataclass
+class Backoff:
+    """指数退避参数。"""
+
+    initial: float = 0.2
+    factor: float = 2.0
+    max_delay: float = 2.0
+
+    def delays(self):
+        delay = self.initial
+        while True:
+            yield delay
+            delay = min(delay * self.factor, self.max_delay)
+
+
+@dataclass
+class StageResult:
+    """单个就绪阶段的结果。"""
+
+    name: str
+    ok: bool
+    elapsed: float
+    attempts: int
+
+
+@dataclass
+class ReadinessReport:
+    """所有就绪阶段的结果。"""
+
+    stages: List[StageResult] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return len(self.stages) > 0 and all(s.ok for s in self.stages)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(s.elapsed for s in self.stages)
+
+    def __str__(self) -> str:
+        parts = [f"{s.name} {'✅' if s.ok else '❌'} {s.elapsed:.2f}s" for s in self.stages]
+        return " | ".join(parts)
+
+
+def poll(check: Callable[[], bool], deadline: float, backoff: Optional[Backoff] = None,
+         retry_on: Tuple[Type[BaseException], ...] = (Exception,)):
+    """按指数退避反复调用 check，直到成功或超过 deadline（time.monotonic 的绝对时间）。
+
+    返回 (是否成功, 尝试次数)。check 抛出 retry_on 中的异常视为未就绪，其他异常直接抛出。
+    """
+    backoff = backoff or Backoff()
+    attempts = 0
+    for delay in backoff.delays():
+        attempts += 1
+        try:
+            if check():
+                return True, attempts
+        except retry_on:
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False, attempts
+        time.sleep(min(delay, remaining))
+
+
+def socks_port_open(host: str = SOCKS_HOST, port: int = SOCKS_PORT, timeout: float = 0.5) -> bool:
+    with socket.create_connection((host, port), timeout=timeout):
+        return True
+
+
+def electricity_home_reachable(proxy_config, timeout: float = 2,
+                               scheduler: Optional[RequestScheduler] = default_scheduler) -> bool:
+    """探测能源管理主页。经过调度器时使用最低优先级，与主页的其他请求共用限速，不挤占充值请求。"""
+    def probe():
+        shared_session(proxy_config, retries=0).get(ELECTRICITY_HOME_URL, timeout=timeout).raise_for_status()
+        return True
+
+    if scheduler is None:
+        return probe()
+    return scheduler.call("home", probe, priority=PRIORITY_POLL)
+
+
+def ready_checks(proxy_config) -> List[Tuple[str, Callable[[], bool]]]:
+    """就绪检测的各阶段，按先后顺序排列：SOCKS5 端口、校园网主机、能源管理主页。"""
+    return [
+        ("socks5", socks_port_open),
+        ("campus", lambda: test_network(proxy_config)),
+        ("electricity", lambda: electricity_home_reachable(proxy_config)),
+    ]
+
+
+def wait_for_ready(proxy_config, deadline: float = 60, backoff: Optional[Backoff] = None) -> ReadinessReport:
+    """依次等待 SOCKS5 端口、校园网主机和能源管理主页就绪。
+
+    deadline 为所有阶段共享的总时长（秒），某一阶段失败时不再检查后续阶段。
+    """
+    end = time.monotonic() + deadline
+    report = ReadinessReport()
+    for name, check in ready_checks(proxy_config):
+        ts = time.time()
+        start = time.monotonic()
+        ok, attempts = poll(check, end, backoff)
+        elapsed = time.monotonic() - start
+        report.stages.append(StageResult(name, ok, elapsed, attempts))
+        default_recorder.record(StageRecord(f"ready.{name}", ts, elapsed, ok))
+        if not ok:
+            break
+    return report
+
+
+__all__ = (
+    "Backoff",
+    "StageResult",
+    "ReadinessReport",
+    "poll",
+    "socks_port_open",
+    "electricity_home_reachable",
+    "ready_checks",
+    "wait_for_ready",
+)
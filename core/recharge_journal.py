@@ -0,0 +1,340 @@
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from requests import ConnectTimeout, HTTPError, RequestException
+
+from core.util import RechargeUnknownError
+
+
+recharge_journal_path = "data/recharge_journal.jsonl"
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+
+@dataclass
+class JournalEntry:
+    """一次充值意图。submits 为已经发出（或可能发出）的提交次数。"""
+
+    id: str
+    account: str
+    building: str
+    room: str
+    kwh: int
+    created: float
+    state: str = PENDING
+    submits: int = 0
+    oid: Optional[int] = None
+
+
+def unit_price(infos: Iterable, before: float) -> Optional[float]:
+    """取 before 之前最近一条充值记录的单价（元/度），用于核对金额。"""
+    for info in infos:
+        if info.time.timestamp() < before and info.quantity > 0:
+            return info.money / info.quantity
+    return None
+
+
+def match_recharge(entry: JournalEntry, infos: List, claimed=(), skew: float = 120,
+                   window: float = 600):
+    """在账单中找出与充值意图对应的记录，按时间、度数和金额比对。
+
+    infos 为接口返回的账单（按时间倒序）；claimed 中的 oid 已被其他意图认领，不再参与匹配。
+    skew 容忍本机与服务端的时钟偏差，window 为提交后账单出现的最长时间。
+    """
+    price = unit_price(infos, entry.created - skew)
+    best = None
+    for info in infos:
+        ts = info.time.timestamp()
+        if info.oid in claimed or info.quantity != entry.kwh:
+            continue
+        if not entry.created - skew <= ts <= entry.created + window:
+            continue
+        if price is not None and abs(info.money - price * entry.kwh) > max(0.01, 0.01 * info.money):
+            continue
+        if best is None or abs(ts - entry.created) < abs(best.time.timestamp() - entry.created):
+            best = info
+    return best
+
+
+class RechargeJournal:
+    """充值的预写日志（JSON lines）。
+
+    每次提交前先把充值意图落盘（fsync），再调用充值接口；提交结果不明确（超时、隧道断开）时，
+    根据账单比对判断是否已经扣款，超过 window 秒仍找不到对应记录才允许重新提交，避免重复充值。
+    settle_delays 为接口受理充值后等待账单出现的各次间隔（秒）。
+    """
+
+    def __init__(self, path: str = recharge_journal_path, window: float = 600, skew: float = 120,
+                 keep: float = 7 * 86400, settle_delays: Tuple[float, ...] = (0.5, 1, 2)) -> None:
+        self.path = path
+        self.window = window
+        self.skew = skew
+        self.keep = keep
+        self.settle_delays = settle_delays
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, JournalEntry]] = None
+        self._active = set()
+        self._account_locks: Dict[str, threading.Lock] = {}
+
+    # -- 持久化 --
+
+    def _load(self) -> Dict[str, JournalEntry]:
+        """首次使用时读取日志（调用者持有锁）。"""
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return self._entries
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # 写入过程中断电只会损坏最后一行，忽略即可。
+                continue
+            entry = self._entries.get(event["id"])
+            if entry is None:
+                self._entries[event["id"]] = JournalEntry(**event)
+            else:
+                for name, value in event.items():
+                    setattr(entry, name, value)
+        self._compact()
+        return self._entries
+
+    def _write(self, lines: List[str], mode: str = "a", path: Optional[str] = None) -> None:
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, mode, encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append(self, entry: JournalEntry, **changes) -> None:
+        for name, value in changes.items():
+            setattr(entry, name, value)
+        event = dict(changes, id=entry.id) if changes else asdict(entry)
+        self._write([json.dumps(event, ensure_ascii=False)])
+
+    def _compact(self) -> None:
+        """丢弃过期的已完成记录，重写日志文件。"""
+        expire = time.time() - self.keep
+        self._entries = {
+            k: e for k, e in self._entries.items() if e.state == PENDING or e.created >= expire
+        }
+        tmp = self.path + ".tmp"
+        self._write([json.dumps(asdict(e), ensure_ascii=False) for e in self._entries.values()], "w", tmp)
+        os.replace(tmp, self.path)
+
+    # -- 状态 --
+
+    def begin(self, account: str, building: str, room: str, kwh: int,
+              key: Optional[str] = None) -> JournalEntry:
+        """记录一次充值意图。key 相同的意图视为同一次充值，返回已有的记录。"""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key) if key else None
+            if entry is None:
+                entry = JournalEntry(key or uuid.uuid4().hex, account, building, room, int(kwh), time.time())
+                entries[entry.id] = entry
+                self._append(entry)
+            elif entry.state == FAILED:
+                # 重新开始一次充值，按新的提交时间核对账单。
+                self._append(entry, state=PENDING, created=time.time(), submits=0, oid=None)
+            self._active.add(entry.id)
+            return entry
+
+    def submitting(self, entry: JournalEntry) -> None:
+        with self._lock:
+            self._append(entry, submits=entry.submits + 1)
+
+    def account_lock(self, account: str) -> threading.Lock:
+        """同一账户的提交与认领依次进行，账单中新出现的记录才能唯一地对应到一次充值。"""
+        with self._lock:
+            return self._account_locks.setdefault(account, threading.Lock())
+
+    def claim(self, entry: JournalEntry, infos: List, known: Optional[Iterable[int]] = None):
+        """在账单中认领本次充值对应的记录，认领成功时标记为已确认。
+
+        已被其他意图认领的 oid 不会再被认领。known 为提交前已有的账单 oid，提供时只在新出现的账单中认领；
+        按时间和金额匹配不到、但新账单中只有一条度数相同的记录时认领这一条（容忍服务端的时钟偏差）。
+        """
+        with self._lock:
+            claimed = {e.oid for e in self._load().values() if e.oid is not None and e is not entry}
+            skip = claimed | set(known or ())
+            info = match_recharge(entry, infos, skip, self.skew, self.window)
+            if info is None and known is not None:
+                fresh = [i for i in infos if i.oid not in skip and i.quantity == entry.kwh]
+                if len(fresh) == 1:
+                    info = fresh[0]
+            if info is not None:
+                self._append(entry, state=CONFIRMED, oid=info.oid)
+            return info
+
+    def confirm(self, entry: JournalEntry, info=None) -> None:
+        """标记为已确认。info 为 None 表示接口已受理，但账单中暂未找到对应记录。"""
+        with self._lock:
+            if info is not None and any(e.oid == info.oid and e is not entry for e in self._load().values()):
+                raise ValueError(f"bill {info.oid} is already claimed by another recharge")
+            self._append(entry, state=CONFIRMED, oid=None if info is None else info.oid)
+
+    def fail(self, entry: JournalEntry) -> None:
+        with self._lock:
+            self._append(entry, state=FAILED)
+
+    def release(self, entry: JournalEntry) -> None:
+        with self._lock:
+            self._active.discard(entry.id)
+
+    def pending(self, account: Optional[str] = None) -> List[JournalEntry]:
+        """结果未知、且不在本进程中执行的充值意图。"""
+        with self._lock:
+            return [
+                e for e in self._load().values()
+                if e.state == PENDING and e.id not in self._active and account in (None, e.account)
+            ]
+
+    def last_recharge(self, account: str, building: str, room: str) -> Optional[float]:
+        """该房间最近一次已受理或结果未知的充值意图的创建时间（时间戳），没有时返回 None。"""
+        with self._lock:
+            times = [
+                e.created for e in self._load().values()
+                if (e.account, e.building, e.room) == (account, building, room)
+                and e.state != FAILED and e.submits > 0
+            ]
+        return max(times, default=None)
+
+    def recover(self, em, account: str) -> List[JournalEntry]:
+        """对照账单处理上次中断时遗留的充值意图，返回本次确定结果的记录。
+
+        没有遗留记录时不会访问接口。找到对应账单的标记为已确认；超过 window 仍未出现的标记为失败。
+        """
+        entries = self.pending(account)
+        if not entries:
+            return []
+        infos = list(em.recharge_info)
+        resolved = []
+        for entry in entries:
+            if entry.submits == 0 or self.claim(entry, infos) is None:
+                if entry.submits > 0 and time.time() - entry.created < self.window:
+                    continue
+                self.fail(entry)
+            resolved.append(entry)
+        return resolved
+
+    def settle(self, em, entry: JournalEntry, known: Iterable[int]):
+        """接口受理充值后，在新出现的账单中认领对应记录。
+
+        账单迟迟没有出现时仍标记为已确认（oid 为空），并抛出 RechargeUnknownError；以相同 key 再次调用时会重新认领。
+        """
+        for delay in (0,) + tuple(self.settle_delays):
+            time.sleep(delay)
+            try:
+                info = self.claim(entry, list(em.recharge_info), known)
+            except (RequestException, ValueError):
+                continue
+            if info is not None:
+                return info
+        self.confirm(entry)
+        raise RechargeUnknownError(f"recharge {entry.id} was accepted but its bill has not appeared yet")
+
+
+def _outcome_unknown(e: RequestException) -> bool:
+    """提交充值的请求失败时，服务端是否可能已经处理了它。"""
+    if isinstance(e, ValueError):
+        # 收到了无法解析的响应（例如会话过期时返回的登陆页），充值没有生效。
+        return False
+    if isinstance(e, HTTPError) and e.response is not None:
+        # 网关错误时上游可能已经处理了请求；其他错误响应说明服务端没有受理。
+        return e.response.status_code in (502, 504)
+    return True
+
+
+def _resume(em, journal: RechargeJournal, entry: JournalEntry):
+    """以相同 key 再次调用时，确认上一次提交的结果。"""
+    infos = list(em.recharge_info)
+    if entry.oid is not None:
+        info = next((i for i in infos if i.oid == entry.oid), None)
+    else:
+        info = journal.claim(entry, infos)
+    if info is None:
+        raise RechargeUnknownError(f"recharge {entry.id} may have been submitted; "
+                                   f"it will be checked against the bills later")
+    return info
+
+
+def submit_recharge(em, account: str, building: str, room: str, kwh: int,
+                    journal: Optional[RechargeJournal] = None, key: Optional[str] = None,
+                    attempts: int = 2):
+    """通过预写日志充值，返回本次充值对应的账单记录（`RechargeInfo`）。
+
+    同一账户的充值依次提交，并记下提交前已有的账单，只在新出现的账单中认领。
+    服务端明确拒绝（错误响应、接口返回失败）时标记为失败并抛出原异常；连接未建立时在 attempts 次以内重试；
+    请求可能已经送达（超时、隧道断开）而账单中没有对应记录时，保留为待确认并抛出 RechargeUnknownError，
+    在 window 秒内不会重新提交。
+    key 用于调用者自身的重试（例如重新登陆后再次调用），相同 key 不会重复扣款。
+    不提供 journal 时直接充值，并以最新一条账单作为确认。
+    """
+    if journal is None:
+        em.recharge(building, room, kwh)
+        return next(iter(em.recharge_info))
+
+    with journal.account_lock(account):
+        journal.recover(em, account)
+        known = {i.oid for i in em.recharge_info}
+        entry = journal.begin(account, building, room, kwh, key)
+        try:
+            if entry.submits > 0:
+                return _resume(em, journal, entry)
+            for attempt in range(attempts):
+                journal.submitting(entry)
+                try:
+                    em.recharge(building, room, kwh)
+                except ConnectTimeout:
+                    # 连接尚未建立，请求没有发出，可以立即重试。
+                    if attempt + 1 == attempts:
+                        journal.fail(entry)
+                        raise
+                    continue
+                except RequestException as e:
+                    if not _outcome_unknown(e):
+                        journal.fail(entry)
+                        raise
+                    # 请求可能已经送达：账单中有对应记录说明已扣款，否则留待之后核对，不能再提交。
+                    try:
+                        info = journal.claim(entry, list(em.recharge_info), known)
+                    except (RequestException, ValueError):
+                        info = None
+                    if info is not None:
+                        return info
+                    raise RechargeUnknownError(f"recharge {entry.id} may have been submitted; "
+                                               f"it will be checked against the bills later") from e
+                except ValueError:
+                    # 接口明确拒绝了本次充值。
+                    journal.fail(entry)
+                    raise
+                return journal.settle(em, entry, known)
+        finally:
+            journal.release(entry)
+
+
+default_recharge_journal = RechargeJournal()
+
+
+__all__ = (
+    "JournalEntry",
+    "match_recharge",
+    "RechargeJournal",
+    "submit_recharge",
+    "default_recharge_journal",
+)
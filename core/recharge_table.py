@@ -0,0 +1,184 @@
+import codecs
+import json
+import re
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.electricity import RechargeInfo
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[\s,]*")
+_info_key = re.compile(r'"info"\s*:\s*\[')
+_success = re.compile(r'"success"\s*:\s*(true|false)')
+
+# (oid, type, money, quantity, ts)
+BillRow = Tuple[int, str, float, int, float]
+
+
+def iter_bill_rows(chunks: Iterable[bytes]) -> Iterator[BillRow]:
+    """从账单接口的响应流中逐条解析记录，不在内存中保留整个响应。
+
+    chunks 为 `response.iter_content()` 产生的字节块。接口返回 success 为 false 时抛出 ValueError。
+    """
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    chunks = iter(chunks)
+    buffer = ""
+    head = ""
+    exhausted = False
+
+    def more() -> bool:
+        nonlocal buffer, exhausted
+        for chunk in chunks:
+            text = decode(chunk)
+            if text:
+                buffer += text
+                return True
+        buffer += decode(b"", final=True)
+        exhausted = True
+        return False
+
+    # 跳过 info 数组之前的部分（其中可能包含 success 字段）。
+    while True:
+        match = _info_key.search(buffer)
+        if match is not None:
+            head = buffer[:match.start()]
+            buffer = buffer[match.end():]
+            break
+        if not more():
+            raise ValueError("api returned no info array")
+    success = _success.search(head)
+    if success is not None and success.group(1) == "false":
+        raise ValueError("api returned an error")
+
+    pos = 0
+    while True:
+        pos = _whitespace.match(buffer, pos).end()
+        if pos == len(buffer):
+            buffer, pos = "", 0
+            if not more():
+                raise ValueError("truncated info array")
+            continue
+        if buffer[pos] == "]":
+            break
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # 当前记录还没有收全。
+            buffer, pos = buffer[pos:], 0
+            if not more():
+                raise
+            continue
+        yield (int(item["oid"]), item["type"], float(item["money"]), int(item["quantity"]),
+               datetime.fromisoformat(item["datetime"]).timestamp())
+        pos = end
+
+    if success is None:
+        while not exhausted:
+            more()
+        success = _success.search(buffer, pos)
+        if success is None or success.group(1) == "false":
+            raise ValueError("api returned an error")
+
+
+class RechargeTable:
+    """按列存储的充值账单。
+
+    oid、金额、度数和时间戳分别保存在 `array` 中，充值类型只保存一份名称和每行的编号，
+    每行只占 33 字节左右，适合长期账户和多房间汇总。遍历时按需构造 `RechargeInfo`。
+    """
+
+    def __init__(self) -> None:
+        self.oid = array("q")
+        self.money = array("d")
+        self.quantity = array("q")
+        self.ts = array("d")
+        self.type_code = array("B")
+        self.types: List[str] = []
+        self._type_index: Dict[str, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[BillRow]) -> "RechargeTable":
+        table = cls()
+        for row in rows:
+            table.append(*row)
+        return table
+
+    @classmethod
+    def from_infos(cls, infos: Iterable[RechargeInfo]) -> "RechargeTable":
+        return cls.from_rows((i.oid, i.type, i.money, i.quantity, i.time.timestamp()) for i in infos)
+
+    def append(self, oid: int, type: str, money: float, quantity: int, ts: float) -> None:
+        code = self._type_index.get(type)
+        if code is None:
+            code = self._type_index[type] = len(self.types)
+            self.types.append(type)
+        self.oid.append(oid)
+        self.money.append(money)
+        self.quantity.append(quantity)
+        self.ts.append(ts)
+        self.type_code.append(code)
+
+    def __len__(self) -> int:
+        return len(self.oid)
+
+    def row(self, i: int) -> RechargeInfo:
+        return RechargeInfo(self.oid[i], self.types[self.type_code[i]], self.money[i], self.quantity[i],
+                            datetime.fromtimestamp(self.ts[i]))
+
+    def __iter__(self) -> Iterator[RechargeInfo]:
+        return (self.row(i) for i in range(len(self)))
+
+    def nbytes(self) -> int:
+        """各列占用的字节数。"""
+        return sum(col.itemsize * len(col) for col in (self.oid, self.money, self.quantity, self.ts, self.type_code))
+
+    # -- 聚合 --
+
+    def total_money(self) -> float:
+        return sum(self.money)
+
+    def total_quantity(self) -> int:
+        return sum(self.quantity)
+
+    def average_price(self) -> Optional[float]:
+        """平均单价（元/度），没有记录时返回 None。"""
+        quantity = self.total_quantity()
+        return self.total_money() / quantity if quantity else None
+
+    def _months(self) -> Tuple[List[float], List[str]]:
+        """覆盖所有记录的各月起点时间戳（本地时区）及对应的 YYYY-MM。"""
+        first = time.localtime(min(self.ts))
+        last = time.localtime(max(self.ts))
+        year, month = first.tm_year, first.tm_mon
+        starts, names = [], []
+        while (year, month) <= (last.tm_year, last.tm_mon):
+            starts.append(time.mktime((year, month, 1, 0, 0, 0, 0, 0, -1)))
+            names.append(f"{year:04d}-{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return starts, names
+
+    def sum_by_month(self, column: str = "money") -> Dict[str, float]:
+        """按月份（YYYY-MM，本地时区）汇总某一列，默认为金额。"""
+        if not len(self):
+            return {}
+        values = getattr(self, column)
+        starts, names = self._months()
+        sums = [0.0] * len(starts)
+        for ts, value in zip(self.ts, values):
+            sums[bisect_right(starts, ts) - 1] += value
+        return {name: s for name, s in zip(names, sums) if s}
+
+    def since(self, ts: float) -> "RechargeTable":
+        """时间戳不早于 ts 的记录组成的新表。"""
+        table = RechargeTable()
+        for i in range(len(self)):
+            if self.ts[i] >= ts:
+                table.append(self.oid[i], self.types[self.type_code[i]], self.money[i], self.quantity[i],
+                             self.ts[i])
+        return table
+
+
+__all__ = ("BillRow", "iter_bill_rows", "RechargeTable")
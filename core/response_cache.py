@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 各端点响应的缓存时长（秒）。
+DEFAULT_TTLS: Dict[str, float] = {
+    "query": 30,
+    "user_account": 60,
+}
+
+
+class ResponseCache:
+    """能源管理接口响应的进程内缓存，按 (端点, 账户) 保存，超过 max_entries 时淘汰最久未使用的条目。
+
+    只缓存 ttls 中列出的端点；充值后由 `ElectricityManagement.recharge` 清除该账户的缓存。
+    每次清除都会增加该账户的代数，清除之前开始的请求返回后不会再写入缓存，避免把充值前的旧账单缓存下来。
+    代数只为正在请求中的账户保留：没有请求在进行时清除缓存直接删去计数，最后一个请求结束时也会删去，计数的数量不超过同时进行的请求数。
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, max_entries: int = 256) -> None:
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Tuple[str, Hashable], Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generations: Dict[Hashable, int] = {}
+        self._filling: Dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint: str, key: Hashable):
+        """返回未过期的缓存，没有时返回 None。"""
+        with self._lock:
+            item = self._items.get((endpoint, key))
+            if item is None or item[0] < time.monotonic():
+                self._items.pop((endpoint, key), None)
+                self.misses += 1
+                return None
+            self._items.move_to_end((endpoint, key))
+            self.hits += 1
+            return item[1]
+
+    def generation(self, key: Hashable) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def _begin_fill(self, key: Hashable) -> int:
+        """登记一个进行中的请求，返回当前代数。"""
+        with self._lock:
+            self._filling[key] = self._filling.get(key, 0) + 1
+            return self._generations.get(key, 0)
+
+    def _end_fill(self, key: Hashable) -> None:
+        with self._lock:
+            count = self._filling.pop(key) - 1
+            if count:
+                self._filling[key] = count
+            else:
+                # 没有请求持有旧的代数了，计数可以删去。
+                self._generations.pop(key, None)
+
+    def put(self, endpoint: str, key: Hashable, value, generation: Optional[int] = None) -> None:
+        """写入缓存。提供 generation 时，若此后该账户的缓存已被清除则放弃写入。
+
+        generation 只在请求登记期间（见 `fetch`）受到保护，没有登记的代数可能在清除时被删去。
+        """
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key, 0):
+                return
+            self._items[(endpoint, key)] = (time.monotonic() + ttl, value)
+            self._items.move_to_end((endpoint, key))
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def fetch(self, endpoint: str, key: Hashable, fn: Callable[[], T]) -> T:
+        value = self.get(endpoint, key)
+        if value is None:
+            generation = self._begin_fill(key)
+            try:
+                value = fn()
+                self.put(endpoint, key, value, generation)
+            finally:
+                self._end_fill(key)
+        return value
+
+    def invalidate(self, key: Hashable, endpoints: Optional[Iterable[str]] = None) -> None:
+        """清除某个账户的缓存，endpoints 为 None 时清除所有端点。"""
+        endpoints = self.ttls if endpoints is None else endpoints
+        with self._lock:
+            if key in self._filling:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            else:
+                self._generations.pop(key, None)
+            for endpoint in endpoints:
+                self._items.pop((endpoint, key), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+__all__ = ("DEFAULT_TTLS", "ResponseCache")
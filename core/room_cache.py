@@ -0,0 +1,93 @@
+import threading
+import time
+from itertools import groupby
+from typing import Dict, Iterable, Optional, Tuple
+
+from core.electricity import open_management
+from core.profile_store import ProfileStore
+from core.session_cache import SessionCache, default_session_cache
+from core.util import get_info, save_info
+
+
+room_cache_path = "data/room_cache.json"
+
+
+class RoomCache:
+    """按付费账户缓存 GetRoom 接口返回的本人宿舍（楼栋编码, 房间号）。
+
+    宿舍很少变动，默认缓存 30 天；换宿舍后调用 `invalidate` 即可重新获取。
+    多个线程共用同一个缓存文件时，读-改-写由锁串行化。
+    """
+
+    def __init__(self, path: str = room_cache_path, ttl: float = 30 * 86400) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, dict]:
+        return get_info(self.path) or {}
+
+    def get(self, account: str) -> Optional[Tuple[str, str]]:
+        entry = self._read().get(account)
+        if entry is None or time.time() - entry["saved_at"] > self.ttl:
+            return None
+        return entry["building"], entry["room"]
+
+    def set(self, account: str, building: str, room: str) -> None:
+        with self._lock:
+            data = self._read()
+            data[account] = {"saved_at": time.time(), "building": building, "room": room}
+            save_info(self.path, data)
+
+    def invalidate(self, account: str) -> None:
+        with self._lock:
+            data = self._read()
+            if data.pop(account, None) is not None:
+                save_info(self.path, data)
+
+
+default_room_cache = RoomCache()
+
+
+def my_room(username, password, proxy_config=None, cache: Optional[RoomCache] = default_room_cache,
+            session_cache: Optional[SessionCache] = default_session_cache, solver=None) -> Tuple[str, str]:
+    """返回付费账户本人的宿舍，命中缓存时不需要登陆。"""
+    if cache is not None:
+        room = cache.get(username)
+        if room is not None:
+            return room
+    em, _ = open_management(username, password, proxy_config, session_cache, solver=solver)
+    return em.my_room(username, cache)
+
+
+def resolve_rooms(store: ProfileStore, proxy_config=None, names: Optional[Iterable[str]] = None,
+                  building_names: Optional[Dict[str, str]] = None,
+                  cache: Optional[RoomCache] = default_room_cache,
+                  session_cache: Optional[SessionCache] = default_session_cache,
+                  solver=None) -> Dict[str, Tuple[str, str]]:
+    """批量补全配置库中未填写楼栋或房间号的充值配置，返回补全的 {配置名: (楼栋编码, 房间号)}。
+
+    每个付费账户最多登陆一次；building_names 为楼栋编码到名称的映射，用于补全楼栋名称。
+    """
+    rooms = [r for r in store.find_rooms() if not r["building_code"] or not r["room"]]
+    if names is not None:
+        names = set(names)
+        rooms = [r for r in rooms if r["name"] in names]
+    rooms.sort(key=lambda r: r["payer"] or "")
+    resolved = {}
+    for payer_name, group in groupby(rooms, key=lambda r: r["payer"] or ""):
+        payer = store.get("payer", payer_name) if payer_name else store.get("payer")
+        if payer is None or not payer["username"]:
+            continue
+        building, room = my_room(payer["username"], payer["password"], proxy_config, cache,
+                                 session_cache, solver)
+        for record in group:
+            name = record.pop("name")
+            record["building_code"], record["room"] = building, room
+            record["building_name"] = (building_names or {}).get(building, building)
+            store.put("room", record, name)
+            resolved[name] = (building, room)
+    return resolved
+
+
+__all__ = ("RoomCache", "default_room_cache", "my_room", "resolve_rooms")
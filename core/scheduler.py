@@ -0,0 +1,191 @@
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 数值越小越优先。
+PRIORITY_RECHARGE = 0
+PRIORITY_INTERACTIVE = 2
+PRIORITY_POLL = 9
+
+# 各端点的默认优先级与令牌桶（每秒令牌数, 桶容量）。
+ENDPOINT_PRIORITIES: Dict[str, int] = {
+    "Submit": PRIORITY_RECHARGE,
+    "GetRoom": PRIORITY_INTERACTIVE,
+    "user_account": PRIORITY_INTERACTIVE,
+    "query": PRIORITY_INTERACTIVE,
+    "home": PRIORITY_INTERACTIVE,
+}
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "Submit": (2, 4),
+    "GetRoom": (1, 2),
+    "user_account": (2, 4),
+    "query": (2, 4),
+    "home": (2, 4),
+}
+
+
+class TokenBucket:
+    """令牌桶，调用者负责加锁。"""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """距离下一个令牌可用还需等待的秒数，0 表示现在就有令牌。"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+
+class RequestScheduler:
+    """能源管理接口的统一调度器。
+
+    - 每个端点一个令牌桶，限制请求速率；
+    - 同时进行的请求数不超过 max_inflight（所有请求共用一条 VPN 隧道），
+      空出的名额按优先级分配，充值先于电表采样；
+    - 带有相同 key 的并发请求合并为一次，共享同一个结果。
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None, max_inflight: int = 4,
+                 priorities: Optional[Dict[str, int]] = None) -> None:
+        limits = DEFAULT_LIMITS if limits is None else limits
+        self.buckets = {endpoint: TokenBucket(rate, burst) for endpoint, (rate, burst) in limits.items()}
+        self.priorities = dict(ENDPOINT_PRIORITIES if priorities is None else priorities)
+        self.max_inflight = max_inflight
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._inflight = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._local = threading.local()
+
+    @contextmanager
+    def priority(self, level: int):
+        """在当前线程内临时指定请求优先级，例如电表采样使用 PRIORITY_POLL。"""
+        saved = getattr(self._local, "priority", None)
+        self._local.priority = level
+        try:
+            yield
+        finally:
+            self._local.priority = saved
+
+    def _delay(self, ticket) -> Optional[float]:
+        """轮到 ticket 时返回需要等待令牌的秒数，未轮到时返回 None（等待通知）。"""
+        if self._inflight >= self.max_inflight:
+            return None
+        for waiter in sorted(self._waiters):
+            bucket = self.buckets.get(waiter[2])
+            delay = 0.0 if bucket is None else bucket.delay()
+            if waiter is ticket:
+                return delay
+            if delay == 0:
+                # 更高优先级的请求已经可以执行。
+                return None
+        return None
+
+    def _acquire(self, endpoint: str, priority: int) -> None:
+        with self._cond:
+            ticket = (priority, next(self._seq), endpoint)
+            self._waiters.append(ticket)
+            try:
+                while True:
+                    delay = self._delay(ticket)
+                    if delay == 0:
+                        break
+                    self._cond.wait(delay)
+            finally:
+                # 等待中被中断（例如 KeyboardInterrupt）时也要让出队列位置。
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+            if endpoint in self.buckets:
+                self.buckets[endpoint].take()
+            self._inflight += 1
+
+    def _release(self) -> None:
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    def call(self, endpoint: str, fn: Callable[[], T], priority: Optional[int] = None,
+             key: Optional[Hashable] = None) -> T:
+        """按端点限速和优先级执行 fn()。
+
+        优先级依次取参数、`priority` 上下文和端点的默认值。提供 key 时，与正在进行的同 key 请求合并。
+        """
+        if priority is None:
+            priority = getattr(self._local, "priority", None)
+        if priority is None:
+            priority = self.priorities.get(endpoint, PRIORITY_INTERACTIVE)
+        if key is not None:
+            with self._cond:
+                future = self._calls.get(key)
+                owner = future is None
+                if owner:
+                    future = self._calls[key] = Future()
+            if not owner:
+                return future.result()
+        try:
+            self._acquire(endpoint, priority)
+        except BaseException as e:
+            # 合并到本次请求的调用者也要收到异常，否则会一直等待。
+            if key is not None:
+                self._finish(key, exception=e)
+            raise
+        try:
+            result = fn()
+        except BaseException as e:
+            if key is not None:
+                self._finish(key, exception=e)
+            raise
+        finally:
+            self._release()
+        if key is not None:
+            self._finish(key, result=result)
+        return result
+
+    def _finish(self, key: Hashable, result=None, exception: Optional[BaseException] = None) -> None:
+        with self._cond:
+            future = self._calls.pop(key)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+
+# 设置环境变量 FEE_SCHEDULER=0 可关闭默认调度器（例如对本地模拟服务做性能测试时）。
+default_scheduler = RequestScheduler() if os.getenv("FEE_SCHEDULER", "1") != "0" else None
+
+
+def polling(scheduler: Optional[RequestScheduler] = None):
+    """电表采样等后台请求使用最低优先级；未启用调度器时不做任何事。"""
+    scheduler = scheduler or default_scheduler
+    return scheduler.priority(PRIORITY_POLL) if scheduler is not None else nullcontext()
+
+
+__all__ = (
+    "PRIORITY_RECHARGE",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_POLL",
+    "DEFAULT_LIMITS",
+    "TokenBucket",
+    "RequestScheduler",
+    "default_scheduler",
+    "polling",
+)
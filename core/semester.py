@@ -0,0 +1,143 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from core.transport import shared_session
+from core.util import get_info, save_info
+
+
+semester_cache_path = "data/semester.json"
+JWC_URL = "https://jwc.shiep.edu.cn/"
+
+SUMMER_VACATION = -1
+WINTER_VACATION = -2
+
+
+@dataclass
+class SemesterCalendar:
+    """一个学期的起止日期，以及按天预先计算好的教学周表。"""
+
+    start: date
+    end: date
+    fetched_at: float = 0.0
+    weeks: List[int] = field(default_factory=list, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.weeks:
+            self.weeks = [offset // 7 for offset in range((self.end - self.start).days + 1)]
+
+    @property
+    def expires_at(self) -> float:
+        """学期结束的次日零点过期；假期中拿到的仍是上学期的日历，一天后再检查新学期是否已公布。"""
+        boundary = datetime.combine(self.end + timedelta(days=1), datetime.min.time()).timestamp()
+        return boundary if boundary > self.fetched_at else self.fetched_at + 86400
+
+    def week(self, day: Optional[date] = None) -> int:
+        """教学周，`-1` 表示暑假，`-2` 表示寒假。"""
+        day = day or date.today()
+        offset = (day - self.start).days
+        if 0 <= offset < len(self.weeks):
+            return self.weeks[offset]
+        return SUMMER_VACATION if day.month > 5 else WINTER_VACATION
+
+
+def fetch_calendar(proxy_config=None) -> SemesterCalendar:
+    """从教务处主页读取当前学期的起止日期。"""
+    # BeautifulSoup 只在这里用到，延迟导入以缩短命令行的启动时间。
+    from bs4 import BeautifulSoup
+
+    response = shared_session(proxy_config).get(JWC_URL)
+    response.raise_for_status()
+    dom = BeautifulSoup(response.text, features="html.parser")
+    start = date.fromisoformat(dom.select("div#semester_start")[0].text.strip())
+    end = date.fromisoformat(dom.select("div#semester_end")[0].text.strip())
+    return SemesterCalendar(start, end, time.time())
+
+
+class SemesterCache:
+    """持久化的学期日历缓存。
+
+    日历在内存和 data/semester.json 中各保存一份，查询教学周不访问网络。
+    过期后先返回旧日历，同时在后台刷新（stale-while-revalidate）；刷新失败时 retry 秒后再试。
+    只有本地完全没有日历时才会同步请求教务处主页。
+    """
+
+    def __init__(self, path: str = semester_cache_path, retry: float = 3600) -> None:
+        self.path = path
+        self.retry = retry
+        self._calendar: Optional[SemesterCalendar] = None
+        self._next_attempt = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _read(self) -> Optional[SemesterCalendar]:
+        data = get_info(self.path)
+        if not data:
+            return None
+        return SemesterCalendar(date.fromisoformat(data["semester_start"]),
+                                date.fromisoformat(data["semester_end"]),
+                                data["fetched_at"])
+
+    def _store(self, calendar: SemesterCalendar) -> None:
+        self._calendar = calendar
+        save_info(self.path, {
+            "semester_start": calendar.start.isoformat(),
+            "semester_end": calendar.end.isoformat(),
+            "fetched_at": calendar.fetched_at,
+        })
+
+    def refresh(self, proxy_config=None) -> SemesterCalendar:
+        """立即从教务处主页更新日历。"""
+        calendar = fetch_calendar(proxy_config)
+        with self._lock:
+            self._store(calendar)
+        return calendar
+
+    def _revalidate(self, proxy_config) -> None:
+        try:
+            self.refresh(proxy_config)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self, proxy_config=None) -> SemesterCalendar:
+        with self._lock:
+            if self._calendar is None:
+                self._calendar = self._read()
+            calendar = self._calendar
+            now = time.time()
+            stale = calendar is not None and now >= calendar.expires_at
+            if stale and not self._refreshing and now >= self._next_attempt:
+                self._refreshing = True
+                self._next_attempt = now + self.retry
+                threading.Thread(target=self._revalidate, args=(proxy_config,),
+                                 name="semester-refresh", daemon=True).start()
+        if calendar is None:
+            calendar = self.refresh(proxy_config)
+        return calendar
+
+    def week(self, day: Optional[date] = None, proxy_config=None) -> int:
+        return self.get(proxy_config).week(day)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._calendar = None
+            self._next_attempt = 0.0
+            save_info(self.path, {})
+
+
+default_semester_cache = SemesterCache()
+
+
+__all__ = (
+    "SUMMER_VACATION",
+    "WINTER_VACATION",
+    "SemesterCalendar",
+    "fetch_calendar",
+    "SemesterCache",
+    "default_semester_cache",
+)
@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from core.util import get_info, save_info
+
+
+session_cache_path = "data/session_cache.json"
+
+# 只持久化统一身份认证（CASTGC / iPlanetDirectoryPro）和能源管理系统的 cookie。
+CACHED_DOMAINS = ("shiep.edu.cn", "10.50.2.206")
+
+
+class SessionCache:
+    """按付费账户在本地保存登陆后的 cookie。
+
+    重复充值时先用缓存的 cookie 访问一次能源管理主页，仍然有效就直接复用，
+    失效时才走完整的 `login_service` 登陆流程。
+    多个线程共用同一个缓存文件时，读-改-写由锁串行化。
+    """
+
+    def __init__(self, path: str = session_cache_path, max_age: float = 12 * 3600,
+                 domains=CACHED_DOMAINS) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.domains = domains
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, dict]:
+        return get_info(self.path) or {}
+
+    def _should_cache(self, domain: str) -> bool:
+        domain = domain.lstrip(".")
+        return any(domain == d or domain.endswith("." + d) for d in self.domains)
+
+    def load(self, username: str, session: requests.Session) -> bool:
+        """把缓存的 cookie 放入 session，没有可用缓存时返回 False。"""
+        entry = self._read().get(username)
+        if entry is None or time.time() - entry["saved_at"] > self.max_age:
+            return False
+        for cookie in entry["cookies"]:
+            session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie["domain"],
+                path=cookie["path"],
+            )
+        return len(entry["cookies"]) > 0
+
+    def save(self, username: str, session: requests.Session) -> None:
+        cookies: List[dict] = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in session.cookies
+            if self._should_cache(c.domain)
+        ]
+        with self._lock:
+            data = self._read()
+            data[username] = {"saved_at": time.time(), "cookies": cookies}
+            save_info(self.path, data)
+
+    def invalidate(self, username: str) -> None:
+        with self._lock:
+            data = self._read()
+            if data.pop(username, None) is not None:
+                save_info(self.path, data)
+
+
+default_session_cache = SessionCache()
+
+
+__all__ = ("SessionCache", "default_session_cache")
@@ -0,0 +1,144 @@
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+USER_AGENT = os.getenv('FEE_UA', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36 Edg/133.0.0.0')
+
+Timeout = Union[float, Tuple[float, float]]
+
+# 按 URL 前缀设置的超时（连接超时, 读取超时），最长的匹配前缀生效。
+DEFAULT_TIMEOUTS: Dict[str, Timeout] = {
+    "https://ids.shiep.edu.cn/": (5, 15),
+    "http://10.50.2.206": (5, 10),
+    # 充值提交不会自动重试，给足读取时间，避免在服务端已受理时误判为失败。
+    "http://10.50.2.206/api/charge/Submit": (5, 30),
+    "https://jwc.shiep.edu.cn/": (5, 10),
+}
+DEFAULT_TIMEOUT: Timeout = (5, 15)
+
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 16
+
+
+def default_retry(total: int = 2) -> Retry:
+    """连接失败与网关错误的重试策略。
+
+    只对幂等方法重试响应错误（urllib3 默认不包含 POST），连接阶段的失败请求尚未发出，可以安全重试。
+    """
+    return Retry(
+        total=total,
+        connect=total,
+        read=0,
+        status=total,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    )
+
+
+class PooledSession(requests.Session):
+    """带连接池、重试策略和按端点超时的会话。"""
+
+    def __init__(self, pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                 retries: int = 2, timeouts: Optional[Dict[str, Timeout]] = None) -> None:
+        super().__init__()
+        self.timeouts = dict(DEFAULT_TIMEOUTS if timeouts is None else timeouts)
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=default_retry(retries),
+        )
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.headers["User-Agent"] = USER_AGENT
+        self.headers["Connection"] = "keep-alive"
+        _sessions.add(self)
+
+    def timeout_for(self, url: str) -> Timeout:
+        best = ""
+        for prefix in self.timeouts:
+            if url.startswith(prefix) and len(prefix) > len(best):
+                best = prefix
+        return self.timeouts[best] if best else DEFAULT_TIMEOUT
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout_for(url)
+        return super().request(method, url, *args, **kwargs)
+
+
+_sessions = weakref.WeakSet()
+_shared: Dict[tuple, PooledSession] = {}
+_shared_lock = threading.Lock()
+
+
+def new_session(proxy_config: Optional[Dict[str, str]] = None, **kwargs) -> PooledSession:
+    """创建一个独立（拥有自己 cookie）的会话，用于需要登陆的流程。"""
+    session = PooledSession(**kwargs)
+    # 应用 SOCKS5 代理配置
+    if proxy_config:
+        session.proxies = proxy_config
+    return session
+
+
+def shared_session(proxy_config: Optional[Dict[str, str]] = None, retries: int = 2) -> PooledSession:
+    """返回进程内共享的会话，用于不需要登陆状态的请求（网络探测、教务处主页等）。"""
+    key = (tuple(sorted((proxy_config or {}).items())), retries)
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = new_session(proxy_config, retries=retries)
+        return _shared[key]
+
+
+@dataclass
+class ConnectionStats:
+    """连接池统计：发出的请求数、新建的连接数和复用连接的请求数。"""
+
+    requests: int = 0
+    new_connections: int = 0
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.new_connections, 0)
+
+
+def _pools(adapter: HTTPAdapter):
+    managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+    for manager in managers:
+        for key in manager.pools.keys():
+            pool = manager.pools.get(key)
+            if pool is not None:
+                yield pool
+
+
+def connection_stats(session: Optional[requests.Session] = None) -> ConnectionStats:
+    """统计指定会话（默认为所有由本模块创建的会话）的连接复用情况。
+
+    统计基于仍在连接池中的 urllib3 连接池，超出 pool_connections 被淘汰的主机不再计入。
+    """
+    stats = ConnectionStats()
+    sessions = [session] if session is not None else list(_sessions)
+    for s in sessions:
+        adapters = {id(a): a for a in s.adapters.values() if isinstance(a, HTTPAdapter)}
+        for adapter in adapters.values():
+            for pool in _pools(adapter):
+                stats.requests += pool.num_requests
+                stats.new_connections += pool.num_connections
+    return stats
+
+
+__all__ = (
+    "PooledSession",
+    "ConnectionStats",
+    "new_session",
+    "shared_session",
+    "connection_stats",
+    "default_retry",
+)
@@ -1,6 +1,7 @@
 import abc
 
-from core.util import save_info, get_info
+from core.profile_store import DEFAULT_PROFILE, ProfileStore, default_profile_store
+from core.util import get_info
 
 
 class Information(abc.ABC):
@@ -22,17 +23,31 @@ class Information(abc.ABC):
         pass
 
 
+# 旧版本使用的单账户 JSON 文件，首次读取默认配置时会被导入配置库。
 payer_info_path = "data/payer_info.json"
 vpn_info_path = "data/vpn_info.json"
 charge_info_path = "data/charge_info.json"
 
 
+def load_record(store: ProfileStore, kind, name, legacy_path):
+    """从配置库读取一条记录，默认配置不存在时尝试从旧版 JSON 文件迁移。"""
+    record = store.get(kind, name)
+    if record is None and name == DEFAULT_PROFILE:
+        legacy = get_info(legacy_path)
+        if legacy is not None:
+            store.put(kind, legacy, name)
+            record = store.get(kind, name)
+    return record
+
+
 class Payer(Information):
     username: str
     password: str
 
-    def __init__(self):
-        """read and load info from file"""
+    def __init__(self, name=DEFAULT_PROFILE, store: ProfileStore = None):
+        """read and load info from profile store"""
+        self.name = name
+        self._store = store or default_profile_store()
         self.username = ""
         self.password = ""
         self.load_info()
@@ -42,12 +57,12 @@ class Payer(Information):
             "username": self.username,
             "password": self.password,
         }
-        save_info(payer_info_path, user_data)
+        self._store.put("payer", user_data, self.name)
         print(f"单个用户 {self.username} 已保存！")
 
 
     def load_info(self):
-        user_data = get_info(payer_info_path)
+        user_data = load_record(self._store, "payer", self.name, payer_info_path)
         if user_data is None:
             return
         self.username = user_data["username"] or ""
@@ -71,14 +86,16 @@ class VpnUser(Information):
     username: str
     password: str
 
-    def __init__(self):
-        """read and load info from file"""
+    def __init__(self, name=DEFAULT_PROFILE, store: ProfileStore = None):
+        """read and load info from profile store"""
+        self.name = name
+        self._store = store or default_profile_store()
         self.username = ""
         self.password = ""
         self.load_info()
 
     def load_info(self):
-        user_data = get_info(vpn_info_path)
+        user_data = load_record(self._store, "vpn", self.name, vpn_info_path)
         if user_data is None:
             return
         self.username = user_data["username"] or ""
@@ -89,7 +106,7 @@ class VpnUser(Information):
             "username": self.username,
             "password": self.password,
         }
-        save_info(vpn_info_path, user_data)
+        self._store.put("vpn", user_data, self.name)
 
     def modify_info(self, arg1, arg2, arg3=None, arg4=None):
         self.username = arg1
@@ -107,32 +124,38 @@ class ChargeInfo(Information):
     building_code: str
     room: str
     amount: int
+    payer: str
     charge_data:dict
 
-    def __init__(self):
-        """read and load info from file"""
+    def __init__(self, name=DEFAULT_PROFILE, store: ProfileStore = None):
+        """read and load info from profile store"""
+        self.name = name
+        self._store = store or default_profile_store()
         self.building_name = ""
         self.building_code = ""
         self.room = ""
         self.amount = 0
+        self.payer = DEFAULT_PROFILE
         self.load_info()
 
     def load_info(self):
-        charge_data = get_info(charge_info_path)
+        charge_data = load_record(self._store, "room", self.name, charge_info_path)
         if charge_data is None:
             return
         self.building_name = charge_data["building_name"]
         self.building_code = charge_data["building_code"]
         self.room = charge_data["room"]
         self.amount = charge_data["amount"]
+        self.payer = charge_data.get("payer") or DEFAULT_PROFILE
     def write_info(self):
         charge_data = {
             "building_name": self.building_name,
             "building_code": self.building_code,
             "room": self.room,
             "amount": self.amount,
+            "payer": self.payer,
         }
-        save_info(charge_info_path, charge_data)
+        self._store.put("room", charge_data, self.name)
 
     def modify_info(self, arg1, arg2, arg3=None, arg4=None):
         self.building_name = arg1
@@ -141,17 +164,24 @@ class ChargeInfo(Information):
         self.amount = arg4
 
     def check_info_empty(self):
-        return self.building_code == "" or self.room == "" or self.amount == 0
+        # 楼栋与房间同时留空表示付费账户本人的宿舍，登陆后自动获取
+        return self.amount == 0 or (self.building_code == "") != (self.room == "")
+    def needs_room(self):
+        return self.building_code == "" or self.room == ""
     def show_info(self)->str:
+        if self.needs_room():
+            return f"充值房间:付费账户本人宿舍(待获取),默认充值度数:{self.amount}"
         return f"充值房间:{self.building_name},{self.room},默认充值度数:{self.amount}"
 
 
 class InfoManger:
 
-    def __init__(self):
-        self.charge_info = ChargeInfo()
-        self.vpn_info = VpnUser()
-        self.payer_info = Payer()
+    def __init__(self, profile=DEFAULT_PROFILE, store: ProfileStore = None):
+        store = store or default_profile_store()
+        self.store = store
+        self.charge_info = ChargeInfo(profile, store)
+        self.vpn_info = VpnUser(profile, store)
+        self.payer_info = Payer(self.charge_info.payer, store)
 
     def check_info_empty(self):
         return self.charge_info.check_info_empty() or self.vpn_info.check_info_empty() or self.payer_info.check_info_empty()
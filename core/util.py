@@ -1,12 +1,17 @@
 import json
+import math
 import os
+import sqlite3
 import subprocess
 import sys
+import tempfile
 import time
-from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
-import requests
-from bs4 import BeautifulSoup
+from core.metrics import timed
+from core.transport import shared_session
 
 
 
@@ -16,49 +21,97 @@ class AuthServiceError(Exception):
     pass
 
 
+class CaptchaError(AuthServiceError):
+    """当登陆需要验证码但无法自动识别时引发此异常，此时不会提交登陆表单。"""
+
+    pass
+
+
 class VPNError(Exception):
     """当疑似未开启 VPN 时引发此异常。"""
 
     pass
 
 
+class RechargeUnknownError(Exception):
+    """当充值请求可能已经送达、却无法在账单中确认结果时引发此异常。
+
+    预写日志会在之后对照账单确认，调用者不应立即重新充值。
+    """
+
+    pass
+
+
+CAMPUS_HOSTS = (
+    "http://10.50.2.206",
+    "http://10.166.18.114",
+    "http://10.166.19.26",
+    "http://10.168.103.76",
+)
+
+
+@dataclass
+class NetworkProbe:
+    """校园网探测结果。
+
+    latencies 记录每个主机的响应耗时（秒），失败为 None；
+    达到或确定无法达到 quorum 后提前返回，尚未完成的主机不会出现在其中。
+    """
+
+    ok: bool
+    latencies: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    @property
+    def reachable(self) -> int:
+        return sum(v is not None for v in self.latencies.values())
+
+
+def _probe_host(url, proxy_config, timeout):
+    start = time.monotonic()
+    try:
+        # 探测需要快速失败，使用不重试的共享会话复用到各主机的连接。
+        shared_session(proxy_config, retries=0).get(url, timeout=timeout)
+    except Exception:
+        return url, None
+    return url, time.monotonic() - start
+
+
+@timed("network.probe")
+def probe_network(proxy_config, timeout: float = 0.5, quorum: float = 0.5, hosts=CAMPUS_HOSTS) -> NetworkProbe:
+    """并发探测所有校园网主机，一旦确定能否达到 quorum 就立即返回。"""
+    need = math.ceil(len(hosts) * quorum)
+    result = NetworkProbe(False)
+    executor = ThreadPoolExecutor(max_workers=len(hosts))
+    try:
+        futures = [executor.submit(_probe_host, url, proxy_config, timeout) for url in hosts]
+        failed = 0
+        for future in as_completed(futures):
+            url, latency = future.result()
+            result.latencies[url] = latency
+            if latency is None:
+                failed += 1
+            if result.reachable >= need:
+                result.ok = True
+                break
+            if len(hosts) - failed < need:
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return result
+
+
 def test_network(proxy_config, timeout: float = 0.5) -> bool:
-    ip_addrs = [
-        "http://10.50.2.206",
-        "http://10.166.18.114",
-        "http://10.166.19.26",
-        "http://10.168.103.76",
-    ]
-
-    ok = 0
-    for url in ip_addrs:
-        try:
-            requests.get(url, timeout=timeout, proxies= proxy_config)
-            ok += 1
-            time.sleep(0.5)
-        except Exception:
-            # print("can't connect to %s" % url)
-            pass
-
-    return ok / len(ip_addrs) >= 0.5
-
-
-def semester_week() -> int:
+    return probe_network(proxy_config, timeout).ok
+
+
+def semester_week(proxy_config=None) -> int:
     """获取当前教学周。
 
-    特别地，`-1` 表示暑假，`-2` 表示寒假。
+    特别地，`-1` 表示暑假，`-2` 表示寒假。学期日历缓存在 data/semester.json 中，见 `core.semester`。
     """
-    jwc_url = "https://jwc.shiep.edu.cn/"
-    response = requests.get(jwc_url)
-    response.raise_for_status()
-    dom = BeautifulSoup(response.text, features="html.parser")
-
-    semeter_start = date.fromisoformat(dom.select("div#semester_start")[0].text)
-    semeter_end = date.fromisoformat(dom.select("div#semester_end")[0].text)
-    if (date.today() - semeter_start).days < 0 or (date.today() - semeter_end).days > 0:
-        return -1 if date.today().month > 5 else -2
-    else:
-        return (date.today() - semeter_start).days // 7
+    from core.semester import default_semester_cache
+
+    return default_semester_cache.week(proxy_config=proxy_config)
 
 def get_resource_path(relative_path):
     """ 获取资源的绝对路径，兼容开发环境和打包后的环境 """
@@ -94,8 +147,26 @@ def ensure_docker_engine():
         return False
 
 def save_info(path, data):
-    with open(path, "w") as f:
-        json.dump(data, f)
+    """原子地写入 JSON：先写入同目录下的临时文件再替换，读取方不会看到写了一半的文件"""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                               dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def connect_db(path) -> sqlite3.Connection:
+    """打开本地 SQLite 数据库，允许在多个线程中使用同一连接（由调用者加锁）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
 
 def get_info(path):
     try:
@@ -106,7 +177,11 @@ def get_info(path):
 
 __all__ = (
     "AuthServiceError",
+    "CaptchaError",
     "VPNError",
+    "RechargeUnknownError",
+    "NetworkProbe",
+    "probe_network",
     "test_network",
     "semester_week",
     "get_resource_path",
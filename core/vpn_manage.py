@@ -2,21 +2,51 @@
 import os
 import subprocess
 import sys
-from core.util import ensure_docker_engine, test_network
+import threading
+import time
+from core.metrics import timed
+from core.util import NetworkProbe, ensure_docker_engine, get_info, probe_network, save_info
 
 
 VPN_CONTAINER_NAME =  "easyconnect_vpn_charge"
+vpn_state_path = "data/vpn_state.json"
+
+
+def keep_alive_enabled() -> bool:
+    """EC_KEEP_ALIVE=1 时退出程序不关闭 VPN 容器，供下次调用复用"""
+    return os.getenv("EC_KEEP_ALIVE", "0").lower() in ("1", "true", "yes")
+
+
+def idle_timeout() -> float:
+    """VPN 容器空闲多久（秒）后由监督进程关闭，默认 30 分钟"""
+    return float(os.getenv("EC_IDLE_TIMEOUT", "1800"))
+
+
 class VpnManage:
 
 
     def __init__(self):
         pass
 
+    @staticmethod
+    def touch():
+        """记录 VPN 最近一次被使用的时间，供监督进程判断是否空闲"""
+        save_info(vpn_state_path, {"last_used": time.time()})
+
+    @staticmethod
+    def last_used() -> float:
+        state = get_info(vpn_state_path)
+        return state["last_used"] if state else 0.0
+
     def check_vpn_environment(self, proxy_config)->bool:
+        return self.probe_vpn_environment(proxy_config).ok
+
+    def probe_vpn_environment(self, proxy_config) -> NetworkProbe:
+        """探测校园网主机，返回是否可用以及各主机的延迟"""
         try:
-            return test_network(proxy_config)
+            return probe_network(proxy_config)
         except Exception:
-            return False
+            return NetworkProbe(False)
 
     def is_vpn_running(self) -> bool:
         try:
@@ -29,6 +59,7 @@ class VpnManage:
         except Exception:
             return False
 
+    @timed("vpn.start")
     def start_vpn(self, user, pwd):
 
         if not ensure_docker_engine():
@@ -36,6 +67,8 @@ class VpnManage:
 
         if self.is_vpn_running():
             print("🔗 VPN 已在后台运行。")
+            # 复用的容器也算一次使用，否则监督进程可能按上次的使用时间立即判定空闲。
+            self.touch()
             return
 
         # 检查是否存在已停止的同名容器，如果有则先删除（防止 --name 冲突）
@@ -70,12 +103,77 @@ class VpnManage:
             # 使用 subprocess 运行
             subprocess.check_call(cmd)
             print("✅ 容器启动指令发送成功。")
+            self.touch()
         except subprocess.CalledProcessError as e:
             print(f"❌ 启动失败，请检查 Docker 是否运行或容器名是否冲突: {e}")
 
+    def restart_vpn(self, user, pwd):
+        """健康检查失败时重建 VPN 容器"""
+        self.stop_vpn()
+        self.start_vpn(user, pwd)
+
     @staticmethod
     def stop_vpn():
         """任务结束后调用此函数"""
         print("🔌 正在关闭并清理 VPN 容器...")
         # 只要执行 stop，因为启动时加了 --rm，容器会自动被删除
-        subprocess.run(["docker", "stop", VPN_CONTAINER_NAME], capture_output=True)
\ No newline at end of file
+        subprocess.run(["docker", "stop", VPN_CONTAINER_NAME], capture_output=True)
+
+    @staticmethod
+    def release_vpn():
+        """程序退出时调用：开启保活时只记录使用时间，否则关闭容器"""
+        if keep_alive_enabled():
+            VpnManage.touch()
+            print("🔗 VPN 容器保持后台运行，可被下次调用复用。")
+        else:
+            VpnManage.stop_vpn()
+
+
+class VpnSupervisor:
+    """定期检查 VPN 隧道健康状况。
+
+    连续 max_failures 次检查失败才重建容器；容器空闲超过 idle_timeout 秒后将其关闭。
+    """
+
+    def __init__(self, vpn_manager: VpnManage, user, pwd, proxy_config,
+                 interval: float = 30, max_failures: int = 3, idle_timeout: float = None):
+        self.vpn_manager = vpn_manager
+        self.user = user
+        self.pwd = pwd
+        self.proxy_config = proxy_config
+        self.interval = interval
+        self.max_failures = max_failures
+        self.idle_timeout = idle_timeout
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check_once(self) -> str:
+        """执行一次检查，返回 "idle"、"restart" 或 "ok" """
+        if self.idle_timeout is not None and time.time() - VpnManage.last_used() > self.idle_timeout:
+            if self.vpn_manager.is_vpn_running():
+                print("💤 VPN 容器空闲超时，正在关闭。")
+                VpnManage.stop_vpn()
+            return "idle"
+        if self.vpn_manager.is_vpn_running() and self.vpn_manager.check_vpn_environment(self.proxy_config):
+            self.failures = 0
+            return "ok"
+        self.failures += 1
+        if self.failures >= self.max_failures:
+            print(f"🩺 VPN 连续 {self.failures} 次健康检查失败，正在重启容器。")
+            self.vpn_manager.restart_vpn(self.user, self.pwd)
+            self.failures = 0
+            return "restart"
+        return "ok"
+
+    def run_forever(self):
+        while not self._stop.wait(self.interval):
+            if self.check_once() == "idle":
+                break
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name="vpn-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
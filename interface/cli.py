@@ -1,10 +1,18 @@
+import os
 import time
 
-from core.electricity import RechargeInfo, pay_electricity
+from core.captcha import default_solver
+from core.batch import RechargeJob, batch_recharge, format_results, load_jobs
+from core.electricity import RechargeInfo, open_management, pay_electricity
+from core.history_store import HistoryStore
 from core.user_info_manage import InfoManger
-from core.util import  setup_global_proxy
+from core.pipeline import Pipeline, Stage
+from core.readiness import ReadinessReport, StageResult, poll, ready_checks, wait_for_ready
+from core.room_cache import my_room, resolve_rooms
+from core.session_cache import default_session_cache
+from core.util import CaptchaError, RechargeUnknownError, VPNError, setup_global_proxy
 from core.vpn_manage import VpnManage
-from interface.message import MenuMessage, VpnUserMessage, PayerMessage, ChargeMessage, Success, Error
+from interface.message import MenuMessage, VpnUserMessage, PayerMessage, ChargeMessage, BatchMessage, Success, Error
 import questionary
 
 
@@ -13,10 +21,17 @@ def get_input_val(message):
     return v
 
 
+def charge_failed(e: Exception):
+    """提示充值失败；结果未知时提醒用户不要立即重新充值"""
+    print(Error.error_detail(e))
+    if isinstance(e, RechargeUnknownError):
+        print(ChargeMessage.RECHARGE_UNKNOWN)
+
+
 def select_buildings():
     choice = questionary.select(
         ChargeMessage.BUILDINGS_SELECT,
-        choices=ChargeMessage.Buildings
+        choices=ChargeMessage.Buildings + [ChargeMessage.MY_ROOM]
     ).ask()
     return choice
 
@@ -28,6 +43,11 @@ class Terminal:
         self.info_manager = InfoManger()
         self.vpn_manager = VpnManage()
         self.proxy_config = None  # 存储代理配置
+        self.history = HistoryStore()
+        # 交互模式下本地识别失败时可以让用户手动输入验证码
+        self.captcha_solver = default_solver(interactive=True)
+        # 启动流水线中的 room 阶段是否已补全房间
+        self.room_resolved = False
 
     def electricity_ok_info(self):
         return (f"使用{self.info_manager.payer_info.username}账户付费\n"
@@ -52,9 +72,12 @@ class Terminal:
         elif choice == MenuMessage.OPT_QUICK:
             self.charge_quick()
             self.main_menu()
+        elif choice == MenuMessage.OPT_BATCH:
+            self.charge_batch()
+            self.main_menu()
         elif choice == MenuMessage.OPT_EXIT:
             print("拜拜！")
-            VpnManage.stop_vpn()
+            VpnManage.release_vpn()
             exit(0)
         else:
             self.charge_after_modify()
@@ -93,13 +116,34 @@ class Terminal:
         else:
             self.manage_info()
 
+    def resolve_room(self):
+        """默认充值配置为本人宿舍时，通过 GetRoom 补全楼栋和房间号并写回配置库"""
+        charge_info = self.info_manager.charge_info
+        if not charge_info.needs_room():
+            return True
+        try:
+            resolve_rooms(self.info_manager.store, self.proxy_config, names=[charge_info.name],
+                          building_names=dict(zip(ChargeMessage.Buildings_code, ChargeMessage.Buildings)),
+                          solver=self.captcha_solver)
+        except Exception as e:
+            print(ChargeMessage.ROOM_RESOLVE_FAIL)
+            print(Error.error_detail(e))
+        charge_info.load_info()
+        return not charge_info.needs_room()
+
     def charge_quick(self):
-        """按照默认配置快速充电"""
-        if self.electricity_ok():
+        """按照默认配置快速充电，楼栋和房间号取自配置库，直接提交充值"""
+        if self.resolve_room() and self.electricity_ok():
             print(ChargeMessage.RECHARGE)
-            result:RechargeInfo = pay_electricity(self.info_manager.payer_info.username, self.info_manager.payer_info.password,
-                                              self.info_manager.charge_info.building_code, self.info_manager.charge_info.room,
-                                              self.info_manager.charge_info.amount, self.proxy_config)
+            self.vpn_manager.touch()
+            try:
+                result:RechargeInfo = pay_electricity(self.info_manager.payer_info.username, self.info_manager.payer_info.password,
+                                                  self.info_manager.charge_info.building_code, self.info_manager.charge_info.room,
+                                                  self.info_manager.charge_info.amount, self.proxy_config,
+                                                  history=self.history, solver=self.captcha_solver)
+            except (CaptchaError, RechargeUnknownError) as e:
+                charge_failed(e)
+                return
             print(ChargeMessage.charge_success(result.time, result.money))
 
 
@@ -108,20 +152,69 @@ class Terminal:
     def charge_after_modify(self):
         """首先输入楼栋号、房间号、充值数，然后充值"""
         building_name = select_buildings()
-        building_code = ChargeMessage.get_buildings_code(building_name)
-        room = get_input_val(ChargeMessage.INPUT_ROOM)
+        if building_name == ChargeMessage.MY_ROOM:
+            try:
+                building_code, room = my_room(self.info_manager.payer_info.username,
+                                              self.info_manager.payer_info.password,
+                                              self.proxy_config,
+                                              solver=self.captcha_solver)
+            except CaptchaError as e:
+                charge_failed(e)
+                return
+        else:
+            building_code = ChargeMessage.get_buildings_code(building_name)
+            room = get_input_val(ChargeMessage.INPUT_ROOM)
         amount = get_input_val(ChargeMessage.INPUT_AMOUNT)
         if self.electricity_ok():
             print(ChargeMessage.RECHARGE)
-            result: RechargeInfo = pay_electricity(self.info_manager.payer_info.username,
-                                               self.info_manager.payer_info.password,
-                                               building_code,
-                                               room,
-                                               int(amount),
-                                               self.proxy_config)
+            self.vpn_manager.touch()
+            try:
+                result: RechargeInfo = pay_electricity(self.info_manager.payer_info.username,
+                                                   self.info_manager.payer_info.password,
+                                                   building_code,
+                                                   room,
+                                                   int(amount),
+                                                   self.proxy_config,
+                                                   history=self.history,
+                                                   solver=self.captcha_solver)
+            except (CaptchaError, RechargeUnknownError) as e:
+                charge_failed(e)
+                return
             print(ChargeMessage.charge_success(result.time, result.money))
 
 
+    def charge_batch(self):
+        """从任务文件读取多个房间，一次登陆后批量充值"""
+        path = get_input_val(BatchMessage.INPUT_FILE).strip()
+        try:
+            jobs = load_jobs(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(BatchMessage.LOAD_FAIL)
+            print(Error.error_detail(e))
+            return
+        if not jobs:
+            print(BatchMessage.EMPTY)
+            return
+        # 任务文件中的楼栋既可以写编码(C3)，也可以写名称(三号学生公寓)
+        jobs = [RechargeJob(ChargeMessage.get_buildings_code(job.building) or job.building, job.room, job.kwh)
+                for job in jobs]
+        print(BatchMessage.batch_ok_info(len(jobs), sum(job.kwh for job in jobs)))
+        if questionary.confirm(ChargeMessage.INPUT_OK).ask():
+            print(ChargeMessage.RECHARGE)
+            self.vpn_manager.touch()
+            try:
+                results = batch_recharge(self.info_manager.payer_info.username,
+                                         self.info_manager.payer_info.password,
+                                         jobs,
+                                         self.proxy_config,
+                                         solver=self.captcha_solver)
+            except (CaptchaError, RechargeUnknownError) as e:
+                charge_failed(e)
+                return
+            print(format_results(results))
+            if any(r.unknown for r in results):
+                print(ChargeMessage.RECHARGE_UNKNOWN)
+
     def modify_vpn_info(self):
         """输入 username, password"""
         print("填写VPN信息：\n")
@@ -143,8 +236,12 @@ class Terminal:
         print("填充值相关信息\n")
 
         building_name = select_buildings()
-        building_code = ChargeMessage.get_buildings_code(building_name)
-        room = get_input_val(ChargeMessage.INPUT_ROOM)
+        if building_name == ChargeMessage.MY_ROOM:
+            # 留空，VPN 就绪后自动获取
+            building_name, building_code, room = "", "", ""
+        else:
+            building_code = ChargeMessage.get_buildings_code(building_name)
+            room = get_input_val(ChargeMessage.INPUT_ROOM)
         amount = get_input_val(ChargeMessage.INPUT_AMOUNT)
         self.info_manager.modify_info(1, building_name, building_code, room, amount)
         print(Success.INFO_MODIFY)
@@ -171,10 +268,72 @@ class Terminal:
         if charge_info_check:
             self.modify_charge_info()
 
+    def wait_vpn_ready(self, deadline=None):
+        """轮询等待 VPN 隧道与能源管理系统就绪，并打印各阶段用时"""
+        if deadline is None:
+            deadline = float(os.getenv("EC_READY_TIMEOUT", "60"))
+        report = wait_for_ready(self.proxy_config, deadline)
+        print(VpnUserMessage.ready_report(report))
+        return report.ok
+
+    def startup(self, deadline=None):
+        """并行执行启动流程，返回 VPN 是否就绪
+
+        VPN 容器启动的同时加载验证码识别模型；SOCKS5 端口可用后立即开始预先登陆（写入会话缓存），
+        与校园网、能源管理主页的就绪检测同时进行。最后打印关键路径上各阶段的用时。
+        """
+        if deadline is None:
+            deadline = float(os.getenv("EC_READY_TIMEOUT", "60"))
+        vpn = self.info_manager.vpn_info
+        payer = self.info_manager.payer_info
+        clock = {}
+
+        def proxy(_):
+            self.proxy_config = setup_global_proxy()
+            return self.proxy_config
+
+        def ready_stage(name):
+            def fn(deps):
+                if name == "socks5":
+                    # 就绪检测共享同一个截止时间，从容器启动完成时开始计算
+                    clock["end"] = time.monotonic() + deadline
+                check = dict(ready_checks(deps.get("proxy")))[name]
+                ok, attempts = poll(check, clock["end"])
+                if not ok:
+                    raise VPNError(f"{name} is not ready")
+                return attempts
+            return fn
+
+        def prefetch(deps):
+            # 不使用交互式识别，需要手动输入验证码时留到充值时再登陆
+            open_management(payer.username, payer.password, deps["proxy"], default_session_cache,
+                            solver=default_solver())
+
+        report = Pipeline([
+            Stage("vpn", lambda _: self.vpn_manager.start_vpn(vpn.username, vpn.password)),
+            Stage("proxy", proxy),
+            Stage("captcha_model", lambda _: self.captcha_solver.prepare()),
+            Stage("socks5", ready_stage("socks5"), ("vpn",)),
+            Stage("campus", ready_stage("campus"), ("socks5", "proxy")),
+            Stage("electricity", ready_stage("electricity"), ("campus", "proxy")),
+            Stage("login", prefetch, ("electricity", "proxy")),
+            Stage("room", lambda _: self.resolve_room(), ("login",)),
+        ]).run()
+        self.room_resolved = bool(report.value("room"))
+
+        ready = ReadinessReport([
+            StageResult(name, run.ok, run.elapsed, run.value or 0)
+            for name, run in ((n, report.runs[n]) for n in ("socks5", "campus", "electricity"))
+            if not run.skipped
+        ])
+        print(VpnUserMessage.ready_report(ready))
+        print(VpnUserMessage.pipeline_report(report))
+        return ready.ok
+
     def run(self):
         """
         1.检查配置信息
-        2.登陆VPN
+        2.并行启动VPN、加载本地资源，隧道可用后预先登陆
         3.检查VPN
         """
         print(MenuMessage.BANNER)
@@ -185,11 +344,8 @@ class Terminal:
         else:
             print(Success.INFO_DETECT)
 
-        self.vpn_manager.start_vpn(self.info_manager.vpn_info.username, self.info_manager.vpn_info.password)
-        self.proxy_config = setup_global_proxy()
-        time.sleep(8)
-
-        while not self.vpn_manager.check_vpn_environment(self.proxy_config):
+        ready = self.startup()
+        while not ready:
             print(VpnUserMessage.VPN_FAIL)
             choice = questionary.select(
                 "选择处理方式",
@@ -200,14 +356,16 @@ class Terminal:
                 VpnManage.stop_vpn()
                 time.sleep(2)
                 self.vpn_manager.start_vpn(self.info_manager.vpn_info.username, self.info_manager.vpn_info.password)
-            elif choice == "刷新等待":
-                time.sleep(2)
-            else:
+            elif choice != "刷新等待":
                 VpnManage.stop_vpn()
                 exit(1)
-        else:
-            print(VpnUserMessage.VPN_SUCCESS)
+            ready = self.wait_vpn_ready()
+        print(VpnUserMessage.VPN_SUCCESS)
 
+        # 只在首次使用时访问 GetRoom，之后快捷充值直接使用配置库中的房间；
+        # 启动流水线已经补全时不再重复
+        if not self.room_resolved:
+            self.resolve_room()
         self.main_menu()
 
 
@@ -0,0 +1,287 @@
+import json
+import threading
+import uuid
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from requests.exceptions import JSONDecodeError
+
+from core.auto_recharge import AutoRecharger, ManagedRoom, load_rooms
+from core.electricity import ElectricityManagement, open_management
+from core.history_store import HistoryStore
+from core.meter_store import MeterPoller, MeterStore
+from core.readiness import wait_for_ready
+from core.recharge_journal import default_recharge_journal, submit_recharge
+from core.response_cache import ResponseCache
+from core.room_cache import default_room_cache
+from core.scheduler import polling
+from core.session_cache import default_session_cache
+from core.transport import connection_stats
+from core.user_info_manage import InfoManger
+from core.util import AuthServiceError, CaptchaError, VPNError, get_info, setup_global_proxy
+from core.vpn_manage import VpnManage, VpnSupervisor, idle_timeout
+
+
+class ElectricityDaemon:
+    """常驻后台，保持 VPN 容器、代理配置和已登陆的能源管理会话，供本地 HTTP 接口调用。"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, ready_timeout: float = 60,
+                 poll_interval: float = 0):
+        self.info_manager = InfoManger()
+        self.vpn_manager = VpnManage()
+        self.proxy_config = None
+        self.host = host
+        self.port = port
+        self.ready_timeout = ready_timeout
+        self._em = None
+        self._lock = threading.Lock()
+        self.supervisor = None
+        self.poll_interval = poll_interval
+        self.meter_store = MeterStore()
+        self.history_store = HistoryStore()
+        # 面板反复查询时短时间内复用电表状态和账单，充值后自动失效
+        self.response_cache = ResponseCache()
+        self.poller = None
+
+    def start_environment(self):
+        """启动 VPN 并等待隧道就绪"""
+        if self.info_manager.check_info_empty():
+            raise ValueError("配置信息不全，请先运行交互模式填写信息")
+        self.vpn_manager.start_vpn(self.info_manager.vpn_info.username, self.info_manager.vpn_info.password)
+        self.proxy_config = setup_global_proxy()
+        report = wait_for_ready(self.proxy_config, self.ready_timeout)
+        print(f"⏱️ 就绪检测: {report}")
+        if not report.ok:
+            raise VPNError("vpn is not ready")
+        # 守护进程本身一直在使用 VPN，因此不做空闲关闭，只负责健康检查和重启。
+        self.supervisor = VpnSupervisor(self.vpn_manager,
+                                        self.info_manager.vpn_info.username,
+                                        self.info_manager.vpn_info.password,
+                                        self.proxy_config)
+        self.supervisor.start()
+        if self.poll_interval > 0:
+            self.poller = MeterPoller(self.poll_meter,
+                                      self.meter_store,
+                                      self.info_manager.payer_info.username,
+                                      self.poll_interval)
+            self.poller.start()
+
+    def management(self, refresh: bool = False) -> ElectricityManagement:
+        """返回常驻的能源管理对象，必要时重新登陆"""
+        with self._lock:
+            if refresh:
+                default_session_cache.invalidate(self.info_manager.payer_info.username)
+                self._em = None
+            if self._em is None:
+                account = self.info_manager.payer_info.username
+                em, _ = open_management(account,
+                                        self.info_manager.payer_info.password,
+                                        self.proxy_config,
+                                        default_session_cache)
+                self._em = em.use_cache(self.response_cache, account)
+            return self._em
+
+    def call(self, fn):
+        """在常驻会话上执行 fn(em)。
+
+        会话过期时接口会返回登陆页而不是 JSON，此时请求并未生效，可以安全地重新登陆后重试一次。
+        需要验证码却无法识别（CaptchaError）时重新登陆也无济于事，直接抛出。
+        """
+        self.vpn_manager.touch()
+        try:
+            return fn(self.management())
+        except CaptchaError:
+            raise
+        except (AuthServiceError, JSONDecodeError):
+            return fn(self.management(refresh=True))
+
+    def poll_meter(self):
+        """后台采样电表，优先级低于充值和接口查询"""
+        with polling():
+            return self.call(lambda em: em.meter_state)
+
+    def meter(self) -> dict:
+        return asdict(self.call(lambda em: em.meter_state))
+
+    def history(self, limit: int = 20) -> list:
+        """增量同步账单后从本地缓存返回最近的记录"""
+        account = self.info_manager.payer_info.username
+        self.call(lambda em: self.history_store.sync(account, em.recharge_info))
+        return [asdict(info) for info in self.history_store.recent(account, limit)]
+
+    def spend(self, by: str = "month") -> dict:
+        """按月份或房间统计本地缓存中的充值金额"""
+        account = self.info_manager.payer_info.username
+        if by == "room":
+            return {f"{b}-{r}": money for (b, r), money in self.history_store.spend_by_room(account).items()}
+        if by == "month":
+            return self.history_store.spend_by_month(account)
+        raise ValueError(f"unknown grouping: {by}")
+
+    def usage(self, days: float = 30, bucket: str = "day") -> dict:
+        """根据本地采样数据统计用电量，不访问能源管理系统"""
+        account = self.info_manager.payer_info.username
+        start = datetime.now() - timedelta(days=days)
+        return {
+            "consumption": self.meter_store.consumption(account, start),
+            "buckets": [asdict(a) for a in self.meter_store.downsample(account, start, bucket=bucket)],
+        }
+
+    def recharge(self, building, room, kwh=None) -> dict:
+        """充值，kwh 为 None 时使用默认充值配置的度数，否则必须是正整数"""
+        charge_info = self.info_manager.charge_info
+        building = building or charge_info.building_code
+        room = room or charge_info.room
+        if kwh is None:
+            kwh = int(charge_info.amount)
+        elif isinstance(kwh, bool) or not isinstance(kwh, int) or kwh <= 0:
+            raise ValueError(f"kwh must be a positive integer: {kwh!r}")
+        account = self.info_manager.payer_info.username
+        if not building or not room:
+            building, room = self.call(lambda em: em.my_room(account, default_room_cache))
+        # 重新登陆后的重试沿用同一个 key，预写日志会先核对账单，避免重复充值。
+        key = uuid.uuid4().hex
+        latest = self.call(lambda em: submit_recharge(em, account, building, room, kwh,
+                                                      default_recharge_journal, key))
+        self.history_store.add(account, latest, building, room)
+        return {"building": building, "room": room, "kwh": kwh, "oid": latest.oid, "money": latest.money}
+
+    def serve_forever(self):
+        self.start_environment()
+        server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        print(f"🛰️ 守护进程已启动: http://{self.host}:{self.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if self.supervisor is not None:
+                self.supervisor.stop()
+            if self.poller is not None:
+                self.poller.stop()
+            VpnManage.release_vpn()
+
+
+def _make_handler(daemon: ElectricityDaemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, fn):
+            try:
+                self._reply(200, {"success": True, "data": fn()})
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"success": False, "error": str(e)})
+            except Exception as e:
+                self._reply(502, {"success": False, "error": str(e)})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/health":
+                stats = connection_stats()
+                self._reply(200, {"success": True,
+                                  "connections": {"requests": stats.requests,
+                                                  "new": stats.new_connections,
+                                                  "reused": stats.reused},
+                                  "response_cache": {"hits": daemon.response_cache.hits,
+                                                     "misses": daemon.response_cache.misses}})
+            elif url.path == "/meter":
+                self._handle(daemon.meter)
+            elif url.path == "/usage":
+                self._handle(lambda: daemon.usage(float(query.get("days", ["30"])[0]),
+                                                  query.get("bucket", ["day"])[0]))
+            elif url.path == "/spend":
+                self._handle(lambda: daemon.spend(query.get("by", ["month"])[0]))
+            elif url.path == "/history":
+                self._handle(lambda: daemon.history(int(query.get("limit", ["20"])[0])))
+            else:
+                self._reply(404, {"success": False, "error": "not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/recharge":
+                self._reply(404, {"success": False, "error": "not found"})
+                return
+            # 浏览器中的网页可以不经预检向本机发送 text/plain 等“简单请求”，带 Origin 的请求一律拒绝，
+            # 并且只接受 application/json（浏览器发送它之前必须先通过 CORS 预检）。
+            if self.headers.get("Origin") is not None:
+                self._reply(403, {"success": False, "error": "cross-origin requests are not allowed"})
+                return
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                self._reply(415, {"success": False, "error": "Content-Type must be application/json"})
+                return
+
+            def recharge():
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(data, dict):
+                    raise ValueError("body must be a JSON object")
+                return daemon.recharge(data.get("building"), data.get("room"), data.get("kwh"))
+
+            self._handle(recharge)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def supervise(interval: float = 30):
+    """前台运行 VPN 监督：保持容器常驻，健康检查失败时重启，空闲超时后关闭"""
+    info_manager = InfoManger()
+    vpn_manager = VpnManage()
+    vpn_manager.start_vpn(info_manager.vpn_info.username, info_manager.vpn_info.password)
+    supervisor = VpnSupervisor(vpn_manager,
+                               info_manager.vpn_info.username,
+                               info_manager.vpn_info.password,
+                               setup_global_proxy(),
+                               interval=interval,
+                               idle_timeout=idle_timeout())
+    print(f"🩺 VPN 监督已启动，空闲 {supervisor.idle_timeout:.0f}s 后关闭容器")
+    try:
+        supervisor.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def auto_recharge(rooms_path=None, lead_hours: float = 24):
+    """前台运行自动充值：预测各房间电量耗尽时间并提前充值
+
+    rooms_path 为托管房间列表的 JSON 文件，字段同 `ManagedRoom`；省略时托管默认充值配置的房间。
+    """
+    daemon = ElectricityDaemon()
+    if rooms_path:
+        rooms = load_rooms(get_info(rooms_path), lead_hours)
+    else:
+        payer = daemon.info_manager.payer_info
+        charge = daemon.info_manager.charge_info
+        rooms = [ManagedRoom(payer.username, payer.password, charge.building_code, charge.room,
+                             int(charge.amount), lead_hours)]
+    daemon.start_environment()
+    recharger = AutoRecharger(rooms, daemon.meter_store, daemon.proxy_config, daemon.history_store)
+    print(f"🤖 自动充值已启动，托管 {len(rooms)} 个房间")
+
+    def report(line):
+        daemon.vpn_manager.touch()
+        print(line)
+
+    try:
+        recharger.run_forever(report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.supervisor.stop()
+        VpnManage.release_vpn()
+
+
+__all__ = ("ElectricityDaemon", "supervise", "auto_recharge")
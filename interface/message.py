@@ -21,9 +21,10 @@ class MenuMessage:
     OPT_INFO = "✏️ 信息管理"
     OPT_QUICK = "💰 快捷充值"
     OPT_CHANGE = "⚙️  单次更改充值信息后充电"
+    OPT_BATCH = "📦 批量充值"
     OPT_RETURN = "🪄 回到上一级"
     OPT_EXIT = "❌ 退出程序"
-    OPTS_LISTS = [OPT_INFO, OPT_QUICK, OPT_CHANGE, OPT_EXIT]
+    OPTS_LISTS = [OPT_INFO, OPT_QUICK, OPT_CHANGE, OPT_BATCH, OPT_EXIT]
 
 
 class VpnUserMessage:
@@ -34,6 +35,14 @@ class VpnUserMessage:
     VPN_FAIL = "🌐 VPN连接失败，请检查网络设置"
     VPN_SUCCESS = "✅ VPN环境正常"
 
+    @staticmethod
+    def ready_report(report):
+        return f"⏱️ 就绪检测用时 {report.elapsed:.2f}s: {report}"
+
+    @staticmethod
+    def pipeline_report(report):
+        return f"🧭 启动关键路径: {report}"
+
 
 class PayerMessage:
     PAYER_MODIFY = "✏️ 修改付款账号信息"
@@ -47,10 +56,13 @@ class ChargeMessage:
     INPUT_OK = "👉 确认充电？"
     INPUT_AMOUNT = "🪙 请输入充值度数(kwh):"
     RECHARGE = "🎉 充值请求已提交"
+    RECHARGE_UNKNOWN = "⏳ 充值结果未知，稍后会对照充值账单核对，请暂时不要重新充值"
     CHARGE_MODIFY = "✏️ 修改当前默认充值配置"
     CHARGE_QUERY = "🔍 查看当前充值配置"
     INPUT_ROOM = "🚪 请输入你的房间号:"
     BUILDINGS_SELECT = "🏢 请选择你的楼栋"
+    MY_ROOM = "🏠 付费账户本人宿舍(登陆后自动获取)"
+    ROOM_RESOLVE_FAIL = "⚠️ 自动获取宿舍失败"
     Buildings = ["一号学生公寓",
                  "二号学生公寓",
                  "三号学生公寓",
@@ -89,6 +101,16 @@ class ChargeMessage:
         return f"✅ 充值成功! {time} , 花费: {amount}"
 
 
+class BatchMessage:
+    INPUT_FILE = "📄 请输入任务文件路径(CSV/JSON，字段为 building, room, kwh):"
+    LOAD_FAIL = "⚠️ 任务文件读取失败"
+    EMPTY = "⚠️ 任务文件中没有充值任务"
+
+    @staticmethod
+    def batch_ok_info(count, total_kwh):
+        return f"共 {count} 个房间，合计充值 {total_kwh} 度电"
+
+
 class Error:
     INFO_LESS = "⚠️ 信息不全"
     AUTH_FAIL = "🔐 登录失败，用户名或密码错误"
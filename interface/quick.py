@@ -0,0 +1,109 @@
+"""非交互式的快速充值入口，供 cron 和脚本调用。
+
+本模块刻意不导入 questionary / prompt_toolkit 和 BeautifulSoup，
+启动耗时可用 `python -m benchmarks.bench_startup` 检查。
+"""
+
+from core.electricity import pay_electricity
+from core.history_store import HistoryStore
+from core.readiness import wait_for_ready
+from core.room_cache import my_room
+from core.user_info_manage import InfoManger
+from core.util import get_info, setup_global_proxy
+from core.vpn_manage import VpnManage
+from interface.message import ChargeMessage, Error, VpnUserMessage
+
+
+def parse_room(value: str):
+    """把 `C3-101` 拆成楼栋编码和房间号，楼栋也可以写成名称。"""
+    building, sep, room = value.partition("-")
+    if not sep or not building or not room:
+        raise ValueError(f"房间格式应为 楼栋-房间，例如 C3-101: {value}")
+    return ChargeMessage.get_buildings_code(building) or building, room
+
+
+def recharge(room=None, kwh=None, ready_timeout: float = 60) -> int:
+    """按参数充值，省略的参数使用默认充值配置；返回进程退出码"""
+    info_manager = InfoManger()
+    if info_manager.vpn_info.check_info_empty() or info_manager.payer_info.check_info_empty():
+        print(Error.INFO_LESS)
+        return 1
+    charge_info = info_manager.charge_info
+    try:
+        if room:
+            building_code, room = parse_room(room)
+        else:
+            building_code, room = charge_info.building_code, charge_info.room
+        kwh = int(kwh or charge_info.amount)
+    except ValueError as e:
+        # 参数有误时不必启动 VPN。
+        print(Error.error_detail(e))
+        return 1
+    if kwh <= 0:
+        print(Error.INFO_LESS)
+        return 1
+
+    vpn_manager = VpnManage()
+    vpn_manager.start_vpn(info_manager.vpn_info.username, info_manager.vpn_info.password)
+    proxy_config = setup_global_proxy()
+    try:
+        report = wait_for_ready(proxy_config, ready_timeout)
+        print(VpnUserMessage.ready_report(report))
+        if not report.ok:
+            print(VpnUserMessage.VPN_FAIL)
+            return 1
+        vpn_manager.touch()
+        if not building_code or not room:
+            # 默认配置为本人宿舍：使用缓存的 GetRoom 结果
+            building_code, room = my_room(info_manager.payer_info.username, info_manager.payer_info.password,
+                                          proxy_config)
+        result = pay_electricity(info_manager.payer_info.username, info_manager.payer_info.password,
+                                 building_code, room, kwh, proxy_config, history=HistoryStore())
+        print(ChargeMessage.charge_success(result.time, result.money))
+        return 0
+    except Exception as e:
+        print(Error.error_detail(e))
+        return 1
+    finally:
+        VpnManage.release_vpn()
+
+
+def recharge_all(rooms_path=None, max_concurrency: int = 8, ready_timeout: float = 60) -> int:
+    """多个付费账户并发充值；全部成功时返回 0
+
+    rooms_path 为房间列表的 JSON 文件（字段同 `auto --rooms`）；省略时使用配置库中的全部充值配置。
+    """
+    from core.auto_recharge import load_rooms
+    from core.multi_account import MultiAccountExecutor, format_report, group_rooms, jobs_from_profiles
+
+    info_manager = InfoManger()
+    if info_manager.vpn_info.check_info_empty():
+        print(Error.INFO_LESS)
+        return 1
+    try:
+        items = group_rooms(load_rooms(get_info(rooms_path))) if rooms_path else jobs_from_profiles(info_manager.store)
+    except (OSError, TypeError, ValueError) as e:
+        print(Error.error_detail(e))
+        return 1
+    if not items:
+        print(Error.INFO_LESS)
+        return 1
+
+    vpn_manager = VpnManage()
+    vpn_manager.start_vpn(info_manager.vpn_info.username, info_manager.vpn_info.password)
+    proxy_config = setup_global_proxy()
+    try:
+        report = wait_for_ready(proxy_config, ready_timeout)
+        print(VpnUserMessage.ready_report(report))
+        if not report.ok:
+            print(VpnUserMessage.VPN_FAIL)
+            return 1
+        vpn_manager.touch()
+        results = MultiAccountExecutor(proxy_config, max_concurrency).run(items)
+        print(format_report(results))
+        return 0 if all(j.success for r in results for j in r.results) else 1
+    finally:
+        VpnManage.release_vpn()
+
+
+__all__ = ("parse_room", "recharge", "recharge_all")
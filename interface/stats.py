@@ -0,0 +1,20 @@
+"""查看最近各阶段耗时的命令行汇总。"""
+
+from core.metrics import format_summary, load_records, metrics_path, prometheus_text, summarize
+
+
+def show_stats(last: int = 500, prometheus=None, path: str = metrics_path) -> int:
+    """打印最近 last 条记录的分位数汇总，可选导出 Prometheus 文本文件"""
+    records = load_records(path, last)
+    if not records:
+        print(f"暂无耗时记录: {path}")
+        return 1
+    print(format_summary(summarize(records)))
+    if prometheus:
+        with open(prometheus, "w", encoding="utf-8") as f:
+            f.write(prometheus_text(records))
+        print(f"已导出 Prometheus 文本: {prometheus}")
+    return 0
+
+
+__all__ = ("show_stats",)
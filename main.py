@@ -1,7 +1,53 @@
-from interface import cli
+# 这里只导入 argparse，各子命令需要的模块在分支内按需导入，以缩短脚本调用的启动时间。
+import argparse
+import sys
 
 
-if __name__ == '__main__':
-    terminal = cli.Terminal()
-    terminal.run()
+def parse_args():
+    parser = argparse.ArgumentParser(description="上海电力大学 · 电费充值小助手")
+    sub = parser.add_subparsers(dest="command")
+    recharge = sub.add_parser("recharge", help="非交互式充值，适合 cron 和脚本调用")
+    recharge.add_argument("--room", help="楼栋-房间，例如 C3-101，省略时使用默认充值配置")
+    recharge.add_argument("--kwh", type=int, help="充值度数，省略时使用默认充值配置")
+    multi = sub.add_parser("multi", help="多个付费账户并发充值")
+    multi.add_argument("--rooms", help="房间列表的 JSON 文件（格式同 auto），省略时使用配置库中的全部充值配置")
+    multi.add_argument("--concurrency", type=int, default=8, help="同时登陆充值的账户数上限")
+    daemon = sub.add_parser("daemon", help="常驻后台，通过本地 HTTP 接口提供充值与查询")
+    daemon.add_argument("--host", default="127.0.0.1")
+    daemon.add_argument("--port", type=int, default=8765)
+    daemon.add_argument("--poll-interval", type=float, default=0, help="电表采样间隔（秒），0 表示不采样")
+    supervise = sub.add_parser("supervise", help="保持 VPN 容器常驻，定期健康检查，空闲超时后关闭")
+    supervise.add_argument("--interval", type=float, default=30)
+    auto = sub.add_parser("auto", help="根据耗电速度预测电量耗尽时间，提前自动充值")
+    auto.add_argument("--rooms", help="托管房间列表的 JSON 文件，省略时使用默认充值配置")
+    auto.add_argument("--lead-hours", type=float, default=24, help="预计耗尽前多少小时充值")
+    stats = sub.add_parser("stats", help="查看最近各阶段耗时的分位数汇总")
+    stats.add_argument("--last", type=int, default=500, help="统计最近多少条记录")
+    stats.add_argument("--prometheus", help="同时导出为 Prometheus 文本文件")
+    return parser.parse_args()
+
 
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == "recharge":
+        from interface.quick import recharge
+        sys.exit(recharge(args.room, args.kwh))
+    elif args.command == "multi":
+        from interface.quick import recharge_all
+        sys.exit(recharge_all(args.rooms, args.concurrency))
+    elif args.command == "daemon":
+        from interface.daemon import ElectricityDaemon
+        ElectricityDaemon(args.host, args.port, poll_interval=args.poll_interval).serve_forever()
+    elif args.command == "supervise":
+        from interface.daemon import supervise
+        supervise(args.interval)
+    elif args.command == "auto":
+        from interface.daemon import auto_recharge
+        auto_recharge(args.rooms, args.lead_hours)
+    elif args.command == "stats":
+        from interface.stats import show_stats
+        sys.exit(show_stats(args.last, args.prometheus))
+    else:
+        from interface import cli
+        terminal = cli.Terminal()
+        terminal.run()
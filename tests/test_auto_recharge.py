@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core.auto_recharge import AutoRecharger, ManagedRoom
+from core.electricity import MeterState
+from core.meter_store import MeterStore
+from core.recharge_journal import RechargeJournal
+from tests.test_recharge_journal import FakeManagement
+
+
+class LaggingMeter(FakeManagement):
+    """充值后电表读数一直不变的能源管理接口。"""
+
+    meter_state = MeterState(1, 1.0, 500, 220, 1.0, 20, 1)
+
+    def my_room(self, account, cache=None):
+        return "C3", "101"
+
+
+class AutoRechargerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = MeterStore(os.path.join(self.tmp.name, "meter.db"))
+        self.journal = RechargeJournal(os.path.join(self.tmp.name, "journal.jsonl"), settle_delays=())
+        self.em = LaggingMeter()
+        patcher = mock.patch("core.auto_recharge.open_management", return_value=(self.em, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def recharger(self, cooldown=None):
+        rooms = [ManagedRoom("a", "p", "", "", 10)]
+        return AutoRecharger(rooms, self.store, cache=None, journal=self.journal, room_cache=None,
+                             cooldown=cooldown)
+
+    def test_lagging_meter_is_not_recharged_again_within_cooldown(self):
+        recharger = self.recharger()
+        [first] = recharger.run_cycle()
+        [second] = recharger.run_cycle()
+        self.assertTrue(first.recharged)
+        self.assertFalse(second.recharged)
+        self.assertTrue(second.cooling)
+        self.assertEqual(self.em.submits, 1)
+
+    def test_recharges_again_after_cooldown(self):
+        recharger = self.recharger(cooldown=0)
+        recharger.run_cycle()
+        recharger.run_cycle()
+        self.assertEqual(self.em.submits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
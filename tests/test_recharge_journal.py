@@ -0,0 +1,200 @@
+import os
+import random
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from requests import ConnectTimeout, HTTPError, ReadTimeout, Response
+
+from core.electricity import RechargeInfo
+from core.recharge_journal import CONFIRMED, FAILED, PENDING, RechargeJournal, submit_recharge
+from core.util import RechargeUnknownError
+
+PRICE = 0.617
+
+
+def http_error(status):
+    response = Response()
+    response.status_code = status
+    return HTTPError(f"{status} Server Error", response=response)
+
+
+class FakeManagement:
+    """能源管理接口的替身。outcomes 依次决定每次提交的结果：
+
+    - "ok"：受理并立即生成账单；
+    - "hidden"：受理，但账单要等 `reveal()` 之后才出现；
+    - "lost"：受理并生成账单，但响应丢失（读取超时）；
+    - "timeout"：读取超时，服务端没有处理；
+    - "connect"：连接超时，请求没有发出；
+    - 整数：服务端返回该状态码，没有处理。
+    """
+
+    def __init__(self, outcomes=(), history=1):
+        self.outcomes = list(outcomes)
+        self.bills = []
+        self.hidden = []
+        self.submits = 0
+        self.next_oid = 1
+        self._lock = threading.Lock()
+        # 几天前同样度数的历史账单，不能被认领。
+        for i in range(history):
+            self._bill(10, datetime.now() - timedelta(days=i + 1))
+
+    def _bill(self, kwh, time=None, hidden=False):
+        info = RechargeInfo(self.next_oid, "网上充值", round(kwh * PRICE, 2), kwh, time or datetime.now())
+        self.next_oid += 1
+        (self.hidden if hidden else self.bills).insert(0, info)
+        return info
+
+    def reveal(self):
+        with self._lock:
+            self.bills[:0] = self.hidden
+            self.hidden = []
+
+    def recharge(self, building, room, kwh):
+        with self._lock:
+            outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+            self.submits += 1
+            if isinstance(outcome, int):
+                raise http_error(outcome)
+            if outcome == "connect":
+                raise ConnectTimeout("connect timed out")
+            if outcome == "timeout":
+                raise ReadTimeout("read timed out")
+            self._bill(kwh, hidden=outcome == "hidden")
+            if outcome == "lost":
+                raise ReadTimeout("read timed out")
+
+    @property
+    def recharge_info(self):
+        with self._lock:
+            return iter(list(self.bills))
+
+    @property
+    def charges(self):
+        return len(self.bills) + len(self.hidden)
+
+
+class RechargeJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = RechargeJournal(os.path.join(self.tmp.name, "journal.jsonl"), settle_delays=())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def entries(self):
+        with self.journal._lock:
+            return list(self.journal._load().values())
+
+    def test_success_claims_new_bill(self):
+        em = FakeManagement()
+        info = submit_recharge(em, "a", "C3", "101", 10, self.journal)
+        self.assertEqual(info.oid, 2)
+        [entry] = self.entries()
+        self.assertEqual((entry.state, entry.oid), (CONFIRMED, 2))
+
+    def test_http_error_fails_without_claiming(self):
+        em = FakeManagement([503])
+        # 另一次充值刚生成的账单，时间、度数和金额都能对上。
+        em._bill(10)
+        with self.assertRaises(HTTPError):
+            submit_recharge(em, "a", "C3", "101", 10, self.journal)
+        [entry] = self.entries()
+        self.assertEqual((entry.state, entry.oid), (FAILED, None))
+        self.assertEqual(em.submits, 1)
+
+    def test_login_page_response_fails_without_claiming(self):
+        em = FakeManagement()
+        em._bill(10)
+
+        def recharge(building, room, kwh):
+            em.submits += 1
+            Response().json()
+
+        em.recharge = recharge
+        with self.assertRaises(ValueError):
+            submit_recharge(em, "a", "C3", "101", 10, self.journal)
+        self.assertEqual(self.entries()[0].state, FAILED)
+
+    def test_connect_timeout_is_retried(self):
+        em = FakeManagement(["connect", "ok"])
+        info = submit_recharge(em, "a", "C3", "101", 10, self.journal)
+        self.assertEqual((em.submits, em.charges), (2, 2))
+        self.assertEqual(self.entries()[0].oid, info.oid)
+
+    def test_lost_response_is_claimed_without_resubmitting(self):
+        em = FakeManagement(["lost"])
+        info = submit_recharge(em, "a", "C3", "101", 10, self.journal)
+        self.assertEqual(em.submits, 1)
+        self.assertEqual(info.oid, 2)
+        self.assertEqual(self.entries()[0].state, CONFIRMED)
+
+    def test_timeout_stays_pending_until_window_passes(self):
+        em = FakeManagement(["timeout"])
+        with self.assertRaises(RechargeUnknownError):
+            submit_recharge(em, "a", "C3", "101", 10, self.journal, key="k")
+        [entry] = self.entries()
+        self.assertEqual((entry.state, entry.submits), (PENDING, 1))
+
+        # 窗口内以相同 key 重试：只核对账单，不重新提交。
+        with self.assertRaises(RechargeUnknownError):
+            submit_recharge(em, "a", "C3", "101", 10, self.journal, key="k")
+        # 同一账户的其他充值也不会让它被当成失败。
+        submit_recharge(em, "a", "C3", "102", 20, self.journal)
+        self.assertEqual(em.submits, 2)
+        self.assertEqual(self.journal.pending("a"), [entry])
+
+        # 超过窗口仍没有对应账单，才重新提交。
+        self.journal.window = 0
+        info = submit_recharge(em, "a", "C3", "101", 10, self.journal, key="k")
+        self.assertEqual(em.submits, 3)
+        self.assertEqual((entry.state, entry.oid), (CONFIRMED, info.oid))
+
+    def test_accepted_without_bill_is_confirmed_and_claimed_later(self):
+        em = FakeManagement(["hidden"])
+        with self.assertRaises(RechargeUnknownError):
+            submit_recharge(em, "a", "C3", "101", 10, self.journal, key="k")
+        [entry] = self.entries()
+        self.assertEqual((entry.state, entry.oid), (CONFIRMED, None))
+
+        em.reveal()
+        info = submit_recharge(em, "a", "C3", "101", 10, self.journal, key="k")
+        self.assertEqual(em.submits, 1)
+        self.assertEqual(entry.oid, info.oid)
+
+    def test_claim_skips_bills_claimed_by_other_entries(self):
+        em = FakeManagement()
+        bill = em._bill(10)
+        first = self.journal.begin("a", "C3", "101", 10)
+        second = self.journal.begin("a", "C3", "102", 10)
+        self.assertIs(self.journal.claim(first, list(em.recharge_info)), bill)
+        self.assertIsNone(self.journal.claim(second, list(em.recharge_info)))
+        with self.assertRaises(ValueError):
+            self.journal.confirm(second, bill)
+        self.assertIsNone(second.oid)
+
+    def test_concurrent_batch_never_reports_more_than_charged(self):
+        rng = random.Random(0)
+        em = FakeManagement([503 if rng.random() < 0.3 else "ok" for _ in range(40)], history=20)
+
+        def run(i):
+            try:
+                return submit_recharge(em, "a", "C3", str(100 + i), 10, self.journal).oid
+            except (HTTPError, RechargeUnknownError):
+                return None
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            oids = [oid for oid in executor.map(run, range(40)) if oid is not None]
+        charged = em.charges - 20
+        confirmed = [e.oid for e in self.entries() if e.state == CONFIRMED]
+        self.assertEqual(len(oids), charged)
+        self.assertEqual(len(set(oids)), charged)
+        self.assertEqual(sorted(confirmed), sorted(oids))
+
+
+if __name__ == "__main__":
+    unittest.main()